@@ -76,6 +76,86 @@ class Config:
     MAX_RETRIES = 3  # Database reconnection attempts
     FLOOD_WAIT_TOLERANCE = 60  # Seconds to wait on flood
     
+    # ═══════════════════════════════════════════════
+    # ⚡ PERFORMANCE & CACHING
+    # ═══════════════════════════════════════════════
+    MEMBERSHIP_CACHE_POSITIVE_TTL = int(os.getenv("MEMBERSHIP_CACHE_POSITIVE_TTL", "600"))  # Seconds to trust "joined"
+    MEMBERSHIP_CACHE_NEGATIVE_TTL = int(os.getenv("MEMBERSHIP_CACHE_NEGATIVE_TTL", "20"))  # Seconds to trust "not joined"
+    MEMBERSHIP_CACHE_MAX_SIZE = int(os.getenv("MEMBERSHIP_CACHE_MAX_SIZE", "50000"))  # Max cached (user, channel) pairs
+    
+    # Content cache (deep link lookups)
+    CONTENT_CACHE_TTL = int(os.getenv("CONTENT_CACHE_TTL", "300"))  # Seconds to keep found content
+    CONTENT_CACHE_NEGATIVE_TTL = int(os.getenv("CONTENT_CACHE_NEGATIVE_TTL", "30"))  # Seconds to remember unknown copy_ids
+    CONTENT_CACHE_MAX_SIZE = int(os.getenv("CONTENT_CACHE_MAX_SIZE", "10000"))  # Max cached copy_ids (LRU)
+    
+    MEMBERSHIP_CHECK_CONCURRENT = os.getenv("MEMBERSHIP_CHECK_CONCURRENT", "Yes").lower() == "yes"  # Check all channels at once
+    MEMBERSHIP_CHECK_CONCURRENCY = int(os.getenv("MEMBERSHIP_CHECK_CONCURRENCY", "5"))  # Parallel checks per request
+    MEMBERSHIP_CHECK_TIMEOUT = float(os.getenv("MEMBERSHIP_CHECK_TIMEOUT", "5"))  # Seconds per get_chat_member call
+    FORCE_JOIN_FAIL_FAST = os.getenv("FORCE_JOIN_FAIL_FAST", "No").lower() == "yes"  # Stop at first not-joined channel
+    INFLIGHT_REQUEST_TTL = int(os.getenv("INFLIGHT_REQUEST_TTL", "120"))  # Max seconds a repeated tap is merged into a running request
+    USER_SEEN_INTERVAL = int(os.getenv("USER_SEEN_INTERVAL", "300"))  # Min seconds between last_seen writes per user
+    CHANNEL_REGISTRY_REFRESH_INTERVAL = int(os.getenv("CHANNEL_REGISTRY_REFRESH_INTERVAL", "1800"))  # Seconds between channel info refreshes
+    EXTRA_CHANNELS_SYNC_INTERVAL = int(os.getenv("EXTRA_CHANNELS_SYNC_INTERVAL", "30"))  # Seconds between channel list version checks
+    ROSTER_ENABLED = os.getenv("ROSTER_ENABLED", "Yes").lower() == "yes"  # Answer membership from join/leave events
+    ROSTER_STALE_AFTER = int(os.getenv("ROSTER_STALE_AFTER", "86400"))  # Seconds before a roster entry is re-checked
+    ROSTER_MAX_SIZE = int(os.getenv("ROSTER_MAX_SIZE", "200000"))  # Max (channel, user) entries in memory (LRU)
+    
+    # Read-type API rate limits (calls per second)
+    API_RATE_GET_CHAT_MEMBER = float(os.getenv("API_RATE_GET_CHAT_MEMBER", "20"))
+    API_RATE_GET_CHAT = float(os.getenv("API_RATE_GET_CHAT", "5"))
+    API_RATE_INVITE_LINK = float(os.getenv("API_RATE_INVITE_LINK", "1"))
+    API_RATE_DEFAULT = float(os.getenv("API_RATE_DEFAULT", "5"))
+    RATE_LIMIT_MIN_RATE = 0.2  # Lowest rate after repeated FloodWaits
+    RATE_LIMIT_RECOVERY_STEP = 0.02  # Fraction of base rate regained per success
+    RATE_LIMIT_MAX_WAIT = float(os.getenv("RATE_LIMIT_MAX_WAIT", "2"))  # Fail instead of waiting longer (seconds)
+    FLOOD_SLEEP_THRESHOLD = int(os.getenv("FLOOD_SLEEP_THRESHOLD", "60"))  # Pyrogram auto-sleep for calls outside the rate limiters
+    
+    # Per-user request throttle (/start and button clicks)
+    USER_THROTTLE_ENABLED = os.getenv("USER_THROTTLE_ENABLED", "Yes").lower() == "yes"
+    USER_THROTTLE_BURST = float(os.getenv("USER_THROTTLE_BURST", "5"))  # Requests allowed back to back
+    USER_THROTTLE_RATE = float(os.getenv("USER_THROTTLE_RATE", "0.5"))  # Requests per second refilled
+    
+    # Outbound send scheduler
+    SEND_GLOBAL_RATE = float(os.getenv("SEND_GLOBAL_RATE", "25"))  # Messages per second (Telegram limit ~30)
+    SEND_PER_CHAT_INTERVAL = float(os.getenv("SEND_PER_CHAT_INTERVAL", "1"))  # Seconds between messages to one chat
+    DELETE_BATCH_WINDOW = float(os.getenv("DELETE_BATCH_WINDOW", "2"))  # Seconds to collect superseded messages before deleting
+    
+    # Delivery tracking write-behind buffer
+    DELIVERY_BUFFER_ENABLED = os.getenv("DELIVERY_BUFFER_ENABLED", "Yes").lower() == "yes"
+    DELIVERY_BUFFER_FLUSH_SIZE = int(os.getenv("DELIVERY_BUFFER_FLUSH_SIZE", "200"))  # Records per bulk write
+    DELIVERY_BUFFER_FLUSH_INTERVAL = float(os.getenv("DELIVERY_BUFFER_FLUSH_INTERVAL", "1"))  # Max seconds a record waits
+    DELIVERY_BUFFER_MAX_PENDING = int(os.getenv("DELIVERY_BUFFER_MAX_PENDING", "5000"))  # Deliveries wait above this (backpressure)
+    SEND_MAX_RETRIES = int(os.getenv("SEND_MAX_RETRIES", "3"))  # Re-queues after FloodWait
+    
+    # Durable delivery outbox
+    INSTANCE_ID = os.getenv("INSTANCE_ID", "")  # Worker name for job leases (default: hostname)
+    OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "20"))  # Jobs claimed per batch
+    OUTBOX_LEASE_SECONDS = int(os.getenv("OUTBOX_LEASE_SECONDS", "120"))  # Claimed job is retried after this
+    OUTBOX_POLL_INTERVAL = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))  # Seconds between polls when idle
+    OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))  # Send attempts before giving up
+    OUTBOX_RETENTION = int(os.getenv("OUTBOX_RETENTION", "86400"))  # Seconds finished jobs are kept
+    
+    # Delivery retention (user_deliveries size)
+    DELIVERY_RETENTION_DAYS = int(os.getenv("DELIVERY_RETENTION_DAYS", "0"))  # TTL on delivery records (0 = keep forever)
+    DELIVERY_KEEP_LAST = int(os.getenv("DELIVERY_KEEP_LAST", "100"))  # Records kept per user by the compactor (0 = off)
+    RETENTION_COMPACT_INTERVAL = int(os.getenv("RETENTION_COMPACT_INTERVAL", "21600"))  # Seconds between compactor runs (0 = manual only)
+    RETENTION_COMPACT_PAUSE = float(os.getenv("RETENTION_COMPACT_PAUSE", "0.2"))  # Pause between users (throttle)
+    
+    # Statistics (materialized counters)
+    STATS_RECONCILE_INTERVAL = int(os.getenv("STATS_RECONCILE_INTERVAL", "3600"))  # Seconds between full recounts (0 = off)
+    
+    # Bundles
+    BUNDLE_MAX_ITEMS = int(os.getenv("BUNDLE_MAX_ITEMS", "50"))  # Max contents per bundle deep link
+    
+    # Content ingest
+    ALBUM_COLLECT_WINDOW = float(os.getenv("ALBUM_COLLECT_WINDOW", "2"))  # Seconds to collect album parts
+    INGEST_BATCH_WINDOW = float(os.getenv("INGEST_BATCH_WINDOW", "2"))  # Seconds to collect new posts into one write
+    INGEST_BATCH_MAX = int(os.getenv("INGEST_BATCH_MAX", "50"))  # Flush batch early at this size
+    INGEST_DIGEST_MAX_LINES = int(os.getenv("INGEST_DIGEST_MAX_LINES", "50"))  # Copy IDs per digest message (longer batches are split)
+    BACKFILL_MAX_EMPTY_PAGES = int(os.getenv("BACKFILL_MAX_EMPTY_PAGES", "5"))  # Stop after this many empty 200-ID pages
+    BACKFILL_REPORT_EVERY = int(os.getenv("BACKFILL_REPORT_EVERY", "10"))  # Progress report every N pages
+    CATALOG_BATCH_SIZE = int(os.getenv("CATALOG_BATCH_SIZE", "1000"))  # Rows per bulk write / cursor batch (import/export)
+    
     # ═══════════════════════════════════════════════
     # 📝 LOGGING
     # ═══════════════════════════════════════════════
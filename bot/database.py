@@ -5,11 +5,16 @@ Handles all database operations with automatic reconnection
 """
 
 import logging
-from datetime import datetime
-from typing import Optional, Dict, List
+import time
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Dict, List, Set, Tuple
 from motor.motor_asyncio import AsyncIOMotorClient
+from pymongo import ReturnDocument, UpdateOne
 from pymongo.errors import ConnectionFailure, ServerSelectionTimeoutError
 from bot.config import config
+from bot.payloads import render_link_payload, forget_payload
 
 logger = logging.getLogger(__name__)
 
@@ -67,51 +72,212 @@ async def create_indexes():
         await database.contents.create_index("copy_id", unique=True)
         await database.contents.create_index("content_type")
         await database.contents.create_index("created_at")
+        await database.contents.create_index([("channel_id", 1), ("message_id", 1)])
+        await database.contents.create_index("source_message_id", sparse=True)
+        await database.contents.create_index("message_ids", sparse=True)
+        await database.contents.create_index("link", sparse=True)
+        
+        # Bundle (multi-item deep link) index
+        await database.bundles.create_index("bundle_id", unique=True)
         
         # User delivery tracking indexes
         await database.user_deliveries.create_index([("user_id", 1), ("copy_id", 1)], unique=True)
-        await database.user_deliveries.create_index("delivered_at")
+        await ensure_delivery_ttl_index()
         
         # Extra channels index
         await database.extra_channels.create_index("channel_id", unique=True)
         
+        # Delivery outbox
+        await database.delivery_jobs.create_index("idempotency_key", unique=True)
+        await database.delivery_jobs.create_index([("status", 1), ("next_attempt_at", 1)])
+        await database.delivery_jobs.create_index("claim_token")
+        await database.delivery_jobs.create_index(
+            "completed_at",
+            expireAfterSeconds=config.OUTBOX_RETENTION
+        )
+        
+        # Channel roster (local membership mirror)
+        await database.channel_members.create_index([("channel_id", 1), ("user_id", 1)], unique=True)
+        # Entries older than ROSTER_STALE_AFTER are never used - expire them
+        await _ensure_ttl_index("channel_members", "updated_at", max(config.ROSTER_STALE_AFTER, 1))
+        
+        # Users registry (_id = Telegram user id)
+        await database.users.create_index("last_seen")
+        
         logger.info("✅ Database indexes created successfully!")
     except Exception as e:
         logger.warning(f"⚠️ Index creation warning: {e}")
 
 
+async def _ensure_ttl_index(collection: str, field: str, expire: Optional[int]) -> bool:
+    """
+    Single-field index, with TTL when expire is set
+    Existing index is changed in place (collMod) or rebuilt if TTL is switched on/off
+    
+    Returns:
+        True if the index was changed
+    """
+    indexes = await database[collection].index_information()
+    current = indexes.get(f"{field}_1")
+    
+    if current is not None:
+        current_expire = current.get("expireAfterSeconds")
+        
+        if current_expire == expire:
+            return False
+        
+        if current_expire is not None and expire is not None:
+            await database.command({
+                "collMod": collection,
+                "index": {"keyPattern": {field: 1}, "expireAfterSeconds": expire}
+            })
+            return True
+        
+        await database[collection].drop_index(f"{field}_1")
+    
+    if expire is None:
+        await database[collection].create_index(field)
+    else:
+        await database[collection].create_index(field, expireAfterSeconds=expire)
+    return True
+
+
+async def ensure_delivery_ttl_index():
+    """
+    Per-user history index (newest first) for the compactor and history lookups,
+    plus a delivered_at TTL index when DELIVERY_RETENTION_DAYS > 0
+    """
+    await database.user_deliveries.create_index([("user_id", 1), ("delivered_at", -1)])
+    
+    if config.DELIVERY_RETENTION_DAYS <= 0:
+        # Standalone index is only needed for the TTL
+        if "delivered_at_1" in await database.user_deliveries.index_information():
+            await database.user_deliveries.drop_index("delivered_at_1")
+            logger.info("🧹 Delivery TTL removed")
+        return
+    
+    if await _ensure_ttl_index("user_deliveries", "delivered_at", config.DELIVERY_RETENTION_DAYS * 86400):
+        logger.info(f"🧹 Delivery TTL set to {config.DELIVERY_RETENTION_DAYS} days")
+
+
 # ═══════════════════════════════════════════════════════════════
 # 📝 CONTENT MANAGEMENT
 # ═══════════════════════════════════════════════════════════════
 
+# Read-through cache for get_content: copy_id -> (expires_at, content or None)
+# None = "not found" (short TTL). Writes on this instance invalidate;
+# writes from other instances show up when the entry expires
+_content_cache: "OrderedDict[str, Tuple[float, Optional[Dict]]]" = OrderedDict()
+_content_loads: Dict[str, "asyncio.Task"] = {}
+_content_cache_stats = {"hits": 0, "misses": 0, "merged": 0}
+
+
+def invalidate_content(*copy_ids: str):
+    """Drop cached content (and any in-flight load result) after a write"""
+    for copy_id in copy_ids:
+        _content_cache.pop(copy_id, None)
+        _content_loads.pop(copy_id, None)
+        forget_payload(copy_id)
+
+
+def get_content_cache_stats() -> Dict:
+    """Content cache size and hit counters"""
+    return {"size": len(_content_cache), **_content_cache_stats}
+
+
+async def _load_content(copy_id: str) -> Optional[Dict]:
+    """Single DB read for get_content; result is cached unless invalidated meanwhile"""
+    task = asyncio.current_task()
+    
+    try:
+        content = await database.contents.find_one({"copy_id": copy_id})
+    except Exception as e:
+        logger.error(f"❌ Failed to get content: {e}")
+        content = None
+        ttl = 0
+    else:
+        ttl = config.CONTENT_CACHE_TTL if content else config.CONTENT_CACHE_NEGATIVE_TTL
+    
+    if _content_loads.get(copy_id) is task:
+        del _content_loads[copy_id]
+        
+        if ttl > 0:
+            _content_cache[copy_id] = (time.monotonic() + ttl, content)
+            _content_cache.move_to_end(copy_id)
+            while len(_content_cache) > config.CONTENT_CACHE_MAX_SIZE:
+                _content_cache.popitem(last=False)
+    
+    return content
+
+
+def build_content_document(copy_id: str, message_id: int = None, link: str = None,
+                           content_type: str = "video", message_ids: List[int] = None,
+                           media_group_id: str = None, source_message_id: int = None) -> Dict:
+    """Build a contents document (shared by single and bulk saves)"""
+    content_data = {
+        "copy_id": copy_id,
+        "content_type": content_type,
+        "message_id": message_id,
+        "link": link,
+        "created_at": datetime.utcnow(),
+        "channel_id": config.CONTENT_CHANNEL_ID
+    }
+    
+    if message_ids:
+        content_data["message_ids"] = message_ids
+        content_data["media_group_id"] = media_group_id
+    
+    # Channel post the content came from (links too, used by backfill)
+    if source_message_id:
+        content_data["source_message_id"] = source_message_id
+    
+    # Pre-render delivery message once
+    if link:
+        content_data["payload"] = render_link_payload(link)
+    
+    return content_data
+
+
 async def save_content(copy_id: str, message_id: int = None, link: str = None, 
-                       content_type: str = "video") -> Dict:
+                       content_type: str = "video", message_ids: List[int] = None,
+                       media_group_id: str = None, source_message_id: int = None) -> Dict:
     """
     Save video or link to database
     
     Args:
         copy_id: Unique identifier for content
-        message_id: Telegram message ID (for videos)
+        message_id: Telegram message ID (for videos, first one for albums)
         link: External link (for links)
         content_type: "video" or "link"
+        message_ids: All message IDs of an album (media group)
+        media_group_id: Telegram media group ID (albums only)
+        source_message_id: Content channel post ID
     """
     try:
-        content_data = {
-            "copy_id": copy_id,
-            "content_type": content_type,
-            "message_id": message_id,
-            "link": link,
-            "created_at": datetime.utcnow(),
-            "channel_id": config.CONTENT_CHANNEL_ID
-        }
+        content_data = build_content_document(
+            copy_id, message_id, link, content_type,
+            message_ids, media_group_id, source_message_id
+        )
         
-        # Upsert: Update if exists, insert if new
-        result = await database.contents.update_one(
+        # Upsert: Update if exists, insert if new (old type for the counters)
+        previous = await database.contents.find_one_and_update(
             {"copy_id": copy_id},
             {"$set": content_data},
-            upsert=True
+            projection={"_id": 0, "content_type": 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
         )
         
+        invalidate_content(copy_id)
+        
+        if previous is None:
+            await inc_stats({"total_contents": 1, f"content_types.{content_type}": 1})
+        elif previous.get("content_type") != content_type:
+            await inc_stats({
+                f"content_types.{previous.get('content_type')}": -1,
+                f"content_types.{content_type}": 1
+            })
+        
         logger.info(f"✅ Content saved: {copy_id} ({content_type})")
         return content_data
         
@@ -120,26 +286,195 @@ async def save_content(copy_id: str, message_id: int = None, link: str = None,
         raise
 
 
+async def bulk_save_contents(documents: List[Dict]) -> int:
+    """
+    Insert many contents in one unordered bulk write
+    Existing copy_ids are left untouched
+    
+    Returns:
+        Number of new contents
+    """
+    if not documents:
+        return 0
+    
+    operations = [
+        UpdateOne({"copy_id": doc["copy_id"]}, {"$setOnInsert": doc}, upsert=True)
+        for doc in documents
+    ]
+    
+    result = await database.contents.bulk_write(operations, ordered=False)
+    
+    invalidate_content(*(doc["copy_id"] for doc in documents))
+    
+    deltas = {"total_contents": result.upserted_count}
+    for index in result.upserted_ids:
+        key = f"content_types.{documents[index]['content_type']}"
+        deltas[key] = deltas.get(key, 0) + 1
+    await inc_stats(deltas)
+    
+    logger.info(f"✅ Bulk saved {result.upserted_count} content(s)")
+    return result.upserted_count
+
+
+async def bulk_upsert_contents(documents: List[Dict], ordered: bool = True) -> int:
+    """
+    Insert or update many contents by copy_id (catalog import)
+    created_at is only set for new contents
+    
+    Returns:
+        Number of contents inserted or changed
+    """
+    if not documents:
+        return 0
+    
+    # Current types of existing contents (for the counters, one query)
+    existing = {
+        doc["copy_id"]: doc.get("content_type")
+        async for doc in database.contents.find(
+            {"copy_id": {"$in": [d["copy_id"] for d in documents]}},
+            {"_id": 0, "copy_id": 1, "content_type": 1}
+        )
+    }
+    
+    operations = []
+    for doc in documents:
+        fields = {k: v for k, v in doc.items() if k != "created_at"}
+        operations.append(UpdateOne(
+            {"copy_id": doc["copy_id"]},
+            {"$set": fields, "$setOnInsert": {"created_at": doc.get("created_at") or datetime.utcnow()}},
+            upsert=True
+        ))
+    
+    result = await database.contents.bulk_write(operations, ordered=ordered)
+    
+    invalidate_content(*(doc["copy_id"] for doc in documents))
+    
+    deltas = {"total_contents": result.upserted_count}
+    for doc in documents:
+        new_type = doc.get("content_type")
+        if doc["copy_id"] not in existing:
+            deltas[f"content_types.{new_type}"] = deltas.get(f"content_types.{new_type}", 0) + 1
+        elif existing[doc["copy_id"]] != new_type:
+            old_key = f"content_types.{existing[doc['copy_id']]}"
+            deltas[old_key] = deltas.get(old_key, 0) - 1
+            deltas[f"content_types.{new_type}"] = deltas.get(f"content_types.{new_type}", 0) + 1
+    await inc_stats(deltas)
+    
+    return result.upserted_count + result.modified_count
+
+
+def get_contents_cursor(batch_size: int = 1000):
+    """
+    Cursor over the whole catalog, fetched in batches
+    Used by export - never loads the collection into memory
+    """
+    return database.contents.find(
+        {},
+        {"_id": 0, "payload": 0}
+    ).sort("created_at", 1).batch_size(batch_size)
+
+
+async def get_indexed_sources(channel_id: int, message_ids: List[int], links: List[str]) -> Dict[str, set]:
+    """
+    Which channel posts / links are already in the catalog
+    
+    Returns:
+        {"message_ids": set, "links": set}
+    """
+    indexed_ids = set()
+    indexed_links = set()
+    
+    if message_ids:
+        docs = await database.contents.find(
+            {"channel_id": channel_id, "$or": [
+                {"source_message_id": {"$in": message_ids}},
+                {"message_id": {"$in": message_ids}},
+                {"message_ids": {"$in": message_ids}}
+            ]},
+            {"_id": 0, "source_message_id": 1, "message_id": 1, "message_ids": 1}
+        ).to_list(length=None)
+        
+        for doc in docs:
+            indexed_ids.update(i for i in [doc.get("source_message_id"), doc.get("message_id")] if i)
+            indexed_ids.update(doc.get("message_ids") or [])
+    
+    if links:
+        docs = await database.contents.find(
+            {"link": {"$in": links}},
+            {"_id": 0, "link": 1}
+        ).to_list(length=None)
+        indexed_links = {doc["link"] for doc in docs}
+    
+    return {"message_ids": indexed_ids, "links": indexed_links}
+
+
+async def get_meta(key: str) -> Optional[Dict]:
+    """Read a document from the meta collection (checkpoints, versions)"""
+    return await database.meta.find_one({"_id": key})
+
+
+async def set_meta(key: str, values: Dict):
+    """Update a document in the meta collection"""
+    await database.meta.update_one({"_id": key}, {"$set": values}, upsert=True)
+
+
 async def get_content(copy_id: str) -> Optional[Dict]:
     """
     Retrieve content by copy_id
+    Served from cache; concurrent misses for same copy_id share one query
+    
+    Returns:
+        Content data or None if not found (treat as read-only)
+    """
+    entry = _content_cache.get(copy_id)
+    if entry and entry[0] > time.monotonic():
+        _content_cache.move_to_end(copy_id)
+        _content_cache_stats["hits"] += 1
+        return entry[1]
+    
+    task = _content_loads.get(copy_id)
+    if task:
+        _content_cache_stats["merged"] += 1
+    else:
+        _content_cache_stats["misses"] += 1
+        task = asyncio.ensure_future(_load_content(copy_id))
+        _content_loads[copy_id] = task
+    
+    # Shield: a cancelled caller must not cancel the shared load
+    return await asyncio.shield(task)
+
+
+async def get_contents(copy_ids: List[str]) -> Dict[str, Dict]:
+    """
+    Retrieve several contents in one query
     
     Returns:
-        Content data or None if not found
+        {copy_id: content} for the ones found
     """
     try:
-        content = await database.contents.find_one({"copy_id": copy_id})
-        return content
+        contents = await database.contents.find(
+            {"copy_id": {"$in": copy_ids}}
+        ).to_list(length=len(copy_ids))
+        return {c["copy_id"]: c for c in contents}
     except Exception as e:
-        logger.error(f"❌ Failed to get content: {e}")
-        return None
+        logger.error(f"❌ Failed to get contents: {e}")
+        return {}
 
 
 async def delete_content(copy_id: str) -> bool:
     """Delete content from database"""
     try:
-        result = await database.contents.delete_one({"copy_id": copy_id})
-        return result.deleted_count > 0
+        deleted = await database.contents.find_one_and_delete(
+            {"copy_id": copy_id},
+            projection={"_id": 0, "content_type": 1}
+        )
+        invalidate_content(copy_id)
+        
+        if deleted is None:
+            return False
+        
+        await inc_stats({"total_contents": -1, f"content_types.{deleted.get('content_type')}": -1})
+        return True
     except Exception as e:
         logger.error(f"❌ Failed to delete content: {e}")
         return False
@@ -156,6 +491,9 @@ async def check_already_delivered(user_id: int, copy_id: str) -> bool:
     Returns:
         True if already delivered, False otherwise
     """
+    if get_buffered_delivery(user_id, copy_id):
+        return True
+    
     try:
         existing = await database.user_deliveries.find_one({
             "user_id": user_id,
@@ -167,34 +505,187 @@ async def check_already_delivered(user_id: int, copy_id: str) -> bool:
         return False
 
 
-async def mark_as_delivered(user_id: int, copy_id: str, message_id: int) -> Dict:
+async def mark_as_delivered(user_id: int, copy_id: str, message_id: int,
+                            message_ids: List[int] = None) -> Optional[Dict]:
     """
     Mark content as delivered to user
-    Prevents duplicate delivery
+    One atomic upsert that also hands back the record it replaced
+    
+    Args:
+        message_ids: All delivered message IDs (albums)
+    
+    Returns:
+        Previous delivery ({message_id, message_ids}) or None if first delivery
     """
     try:
         delivery_data = {
             "user_id": user_id,
             "copy_id": copy_id,
             "message_id": message_id,
+            "message_ids": message_ids,
             "delivered_at": datetime.utcnow()
         }
         
-        # Upsert to handle re-delivery
-        await database.user_deliveries.update_one(
+        # Upsert to handle re-delivery, returning the old record
+        previous = await database.user_deliveries.find_one_and_update(
             {"user_id": user_id, "copy_id": copy_id},
             {"$set": delivery_data},
-            upsert=True
+            projection={"_id": 0, "message_id": 1, "message_ids": 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
         )
         
+        if previous is None:
+            await inc_stats({"total_deliveries": 1})
+        
         logger.info(f"✅ Delivery tracked: User {user_id} - Content {copy_id}")
-        return delivery_data
+        return previous
         
     except Exception as e:
         logger.error(f"❌ Failed to track delivery: {e}")
         raise
 
 
+async def mark_many_as_delivered(user_id: int, deliveries: Dict[str, List[int]]) -> Dict[str, Dict]:
+    """
+    Track several deliveries to one user in a single bulk write
+    
+    Args:
+        deliveries: {copy_id: [message IDs]} (several for albums)
+    
+    Returns:
+        Replaced records {copy_id: {message_id, message_ids}}
+    """
+    if not deliveries:
+        return {}
+    
+    try:
+        # Bulk writes don't return old documents - read them first (one query)
+        previous = await database.user_deliveries.find(
+            {"user_id": user_id, "copy_id": {"$in": list(deliveries)}},
+            {"_id": 0, "copy_id": 1, "message_id": 1, "message_ids": 1}
+        ).to_list(length=len(deliveries))
+        
+        now = datetime.utcnow()
+        operations = [
+            UpdateOne(
+                {"user_id": user_id, "copy_id": copy_id},
+                {"$set": {
+                    "user_id": user_id,
+                    "copy_id": copy_id,
+                    "message_id": message_ids[0],
+                    "message_ids": message_ids if len(message_ids) > 1 else None,
+                    "delivered_at": now
+                }},
+                upsert=True
+            )
+            for copy_id, message_ids in deliveries.items()
+        ]
+        
+        result = await database.user_deliveries.bulk_write(operations, ordered=False)
+        await inc_stats({"total_deliveries": result.upserted_count})
+        logger.info(f"✅ Deliveries tracked: User {user_id} - {len(deliveries)} content(s)")
+        return {p["copy_id"]: p for p in previous}
+        
+    except Exception as e:
+        logger.error(f"❌ Failed to track deliveries: {e}")
+        raise
+
+
+# Write-behind delivery records (see DeliveryWriteBuffer in utils/duplicate.py)
+# (user_id, copy_id) -> delivery record; _flushing holds the batch being written
+_buffered_deliveries: "OrderedDict[Tuple[int, str], Dict]" = OrderedDict()
+_flushing_deliveries: Dict[Tuple[int, str], Dict] = {}
+
+
+def buffer_delivery(user_id: int, copy_id: str, message_id: int,
+                    message_ids: List[int] = None) -> Optional[Dict]:
+    """
+    Queue a delivery record for the next bulk write
+    
+    Returns:
+        Buffered record it replaced (re-delivery before flush), else None
+    """
+    key = (user_id, copy_id)
+    replaced = _buffered_deliveries.pop(key, None) or _flushing_deliveries.get(key)
+    
+    _buffered_deliveries[key] = {
+        "user_id": user_id,
+        "copy_id": copy_id,
+        "message_id": message_id,
+        "message_ids": message_ids,
+        "delivered_at": datetime.utcnow()
+    }
+    
+    return replaced
+
+
+def get_buffered_delivery(user_id: int, copy_id: str) -> Optional[Dict]:
+    """Delivery record not yet written to database"""
+    key = (user_id, copy_id)
+    return _buffered_deliveries.get(key) or _flushing_deliveries.get(key)
+
+
+def count_buffered_deliveries() -> int:
+    return len(_buffered_deliveries)
+
+
+async def flush_buffered_deliveries(limit: int) -> List[Tuple[Dict, Dict]]:
+    """
+    Write up to limit buffered records in one unordered bulk write
+    Records stay readable (get_buffered_delivery) until written;
+    on failure or cancellation they go back to the buffer unless a newer one arrived
+    
+    Returns:
+        (written record, replaced database record) pairs for re-deliveries
+    """
+    batch = []
+    while _buffered_deliveries and len(batch) < limit:
+        key, record = _buffered_deliveries.popitem(last=False)
+        _flushing_deliveries[key] = record
+        batch.append(record)
+    
+    if not batch:
+        return []
+    
+    try:
+        # Old records, for superseded message deletion (one query)
+        previous = await database.user_deliveries.find(
+            {"$or": [{"user_id": r["user_id"], "copy_id": r["copy_id"]} for r in batch]},
+            {"_id": 0, "user_id": 1, "copy_id": 1, "message_id": 1, "message_ids": 1}
+        ).to_list(length=len(batch))
+        
+        result = await database.user_deliveries.bulk_write([
+            UpdateOne(
+                {"user_id": r["user_id"], "copy_id": r["copy_id"]},
+                {"$set": r},
+                upsert=True
+            )
+            for r in batch
+        ], ordered=False)
+        await inc_stats({"total_deliveries": result.upserted_count})
+        
+        logger.info(f"✅ Deliveries tracked: {len(batch)} record(s) flushed")
+        replaced = {(p["user_id"], p["copy_id"]): p for p in previous}
+        return [
+            (r, replaced[(r["user_id"], r["copy_id"])])
+            for r in batch
+            if (r["user_id"], r["copy_id"]) in replaced
+        ]
+    
+    except BaseException:
+        for record in reversed(batch):
+            key = (record["user_id"], record["copy_id"])
+            if key not in _buffered_deliveries:
+                _buffered_deliveries[key] = record
+                _buffered_deliveries.move_to_end(key, last=False)
+        raise
+    
+    finally:
+        for record in batch:
+            _flushing_deliveries.pop((record["user_id"], record["copy_id"]), None)
+
+
 async def remove_previous_delivery(user_id: int, copy_id: str) -> bool:
     """
     Remove previous delivery record
@@ -207,6 +698,7 @@ async def remove_previous_delivery(user_id: int, copy_id: str) -> bool:
         })
         
         if result.deleted_count > 0:
+            await inc_stats({"total_deliveries": -1})
             logger.info(f"♻️ Removed previous delivery: User {user_id} - Content {copy_id}")
             return True
         return False
@@ -216,6 +708,63 @@ async def remove_previous_delivery(user_id: int, copy_id: str) -> bool:
         return False
 
 
+def find_users_over_delivery_limit(keep_last: int):
+    """
+    Aggregation cursor of users with more than keep_last deliveries
+    Grouped on the server - only {_id: user_id, count} rows come back
+    """
+    return database.user_deliveries.aggregate([
+        {"$group": {"_id": "$user_id", "count": {"$sum": 1}}},
+        {"$match": {"count": {"$gt": keep_last}}}
+    ], allowDiskUse=True)
+
+
+async def compact_user_deliveries(user_id: int, keep_last: int, batch_size: int = 500) -> int:
+    """
+    Delete all but the newest keep_last delivery records of a user
+    Old record IDs are read in batches (walking the (user_id, delivered_at)
+    index, no in-memory sort) and removed with delete_many
+    
+    Returns:
+        Number of deleted records
+    """
+    deleted = 0
+    batch = []
+    
+    cursor = database.user_deliveries.find(
+        {"user_id": user_id}, {"_id": 1}
+    ).sort("delivered_at", -1).skip(keep_last).batch_size(batch_size)
+    
+    async for doc in cursor:
+        batch.append(doc["_id"])
+        if len(batch) >= batch_size:
+            result = await database.user_deliveries.delete_many({"_id": {"$in": batch}})
+            deleted += result.deleted_count
+            batch = []
+    
+    if batch:
+        result = await database.user_deliveries.delete_many({"_id": {"$in": batch}})
+        deleted += result.deleted_count
+    
+    await inc_stats({"total_deliveries": -deleted})
+    return deleted
+
+
+async def get_collection_size(name: str) -> Dict:
+    """Document count, average document size and index size (bytes)"""
+    try:
+        stats = await database.command("collStats", name)
+        return {
+            "count": stats.get("count", 0),
+            "avg_obj_size": stats.get("avgObjSize", 0),
+            "size": stats.get("size", 0),
+            "index_size": stats.get("totalIndexSize", 0)
+        }
+    except Exception as e:
+        logger.error(f"❌ Failed to get collection stats for {name}: {e}")
+        return {}
+
+
 async def get_user_deliveries(user_id: int, limit: int = 50) -> List[Dict]:
     """Get user's delivery history"""
     try:
@@ -229,10 +778,252 @@ async def get_user_deliveries(user_id: int, limit: int = 50) -> List[Dict]:
         return []
 
 
+# ═══════════════════════════════════════════════════════════════
+# 📦 BUNDLES (Multi-item Deep Links)
+# ═══════════════════════════════════════════════════════════════
+
+async def save_bundle(bundle_id: str, copy_ids: List[str], title: str = None) -> Dict:
+    """Save a bundle of copy_ids under its own deep link id"""
+    try:
+        bundle_data = {
+            "bundle_id": bundle_id,
+            "copy_ids": copy_ids,
+            "title": title,
+            "created_at": datetime.utcnow()
+        }
+        
+        await database.bundles.update_one(
+            {"bundle_id": bundle_id},
+            {"$set": bundle_data},
+            upsert=True
+        )
+        
+        logger.info(f"✅ Bundle saved: {bundle_id} ({len(copy_ids)} items)")
+        return bundle_data
+        
+    except Exception as e:
+        logger.error(f"❌ Failed to save bundle: {e}")
+        raise
+
+
+async def get_bundle(bundle_id: str) -> Optional[Dict]:
+    """Retrieve bundle by id"""
+    try:
+        return await database.bundles.find_one({"bundle_id": bundle_id})
+    except Exception as e:
+        logger.error(f"❌ Failed to get bundle: {e}")
+        return None
+
+
+# ═══════════════════════════════════════════════════════════════
+# 📬 DELIVERY OUTBOX (Durable Delivery Jobs)
+# ═══════════════════════════════════════════════════════════════
+#
+# Job status flow: pending → sending → sent → done
+#                                  ↘ failed
+
+async def enqueue_delivery_job(idempotency_key: str, user_id: int, copy_id: str,
+                               content: Dict, reply_to_message_id: int = None,
+                               random_ids=None) -> Dict:
+    """
+    Create delivery job (no-op if a job with same key exists)
+    
+    Args:
+        random_ids: Telegram random_id(s) used for every send attempt, so
+            Telegram rejects a repeat (list, or {copy_id: list} for bundles)
+    
+    Returns:
+        The stored job (new or existing)
+    """
+    now = datetime.utcnow()
+    job_content = {k: v for k, v in content.items() if k != "_id"}
+    
+    return await database.delivery_jobs.find_one_and_update(
+        {"idempotency_key": idempotency_key},
+        {"$setOnInsert": {
+            "idempotency_key": idempotency_key,
+            "user_id": user_id,
+            "copy_id": copy_id,
+            "content": job_content,
+            "reply_to_message_id": reply_to_message_id,
+            "random_ids": random_ids,
+            "status": "pending",
+            "attempts": 0,
+            "created_at": now,
+            "next_attempt_at": now
+        }},
+        upsert=True,
+        return_document=ReturnDocument.AFTER
+    )
+
+
+async def claim_delivery_jobs(worker_id: str, limit: int, lease_seconds: int) -> List[Dict]:
+    """
+    Claim a batch of due jobs for this worker
+    
+    Claims pending jobs nobody holds a lease on, and jobs whose lease
+    expired (worker crashed mid-send or before tracking). Each job is
+    claimed with its own atomic find_one_and_update, so two workers can
+    never hold the same job; later updates must present its claim_token.
+    """
+    jobs = []
+    
+    for _ in range(limit):
+        now = datetime.utcnow()
+        job = await database.delivery_jobs.find_one_and_update(
+            {"$or": [
+                {
+                    "status": "pending",
+                    "next_attempt_at": {"$lte": now},
+                    "$or": [{"lease_until": None}, {"lease_until": {"$lt": now}}]
+                },
+                {"status": {"$in": ["sending", "sent"]}, "lease_until": {"$lt": now}}
+            ]},
+            {"$set": {
+                "claim_token": f"{worker_id}:{uuid.uuid4().hex}",
+                "worker_id": worker_id,
+                "lease_until": now + timedelta(seconds=lease_seconds)
+            }},
+            sort=[("next_attempt_at", 1)],
+            return_document=ReturnDocument.AFTER
+        )
+        
+        if job is None:
+            break
+        jobs.append(job)
+    
+    return jobs
+
+
+async def release_worker_jobs(worker_id: str) -> int:
+    """
+    Make this worker's unfinished jobs claimable again
+    Used on startup to resume jobs interrupted by a restart
+    """
+    result = await database.delivery_jobs.update_many(
+        {"worker_id": worker_id, "status": {"$in": ["pending", "sending", "sent"]}},
+        {"$set": {"lease_until": datetime.utcnow()}}
+    )
+    return result.modified_count
+
+
+async def update_delivery_job(job_id, claim_token: str, status: str, **fields) -> bool:
+    """
+    Set job status (plus extra fields) in one atomic update
+    Only applies while the caller still holds the claim
+    
+    Returns:
+        False if the job was claimed by another worker in the meantime
+    """
+    fields["status"] = status
+    
+    if status in ["done", "failed"]:
+        fields["completed_at"] = datetime.utcnow()
+    
+    update = {"$set": fields}
+    if status == "sending":
+        update["$inc"] = {"attempts": 1}
+    
+    result = await database.delivery_jobs.update_one({"_id": job_id, "claim_token": claim_token}, update)
+    return result.matched_count > 0
+
+
+async def renew_delivery_job_lease(job_id, claim_token: str, lease_seconds: int) -> bool:
+    """
+    Extend the lease of a job that is still being sent
+    
+    Returns:
+        False if the job was claimed by another worker in the meantime
+    """
+    result = await database.delivery_jobs.update_one(
+        {"_id": job_id, "claim_token": claim_token},
+        {"$set": {"lease_until": datetime.utcnow() + timedelta(seconds=lease_seconds)}}
+    )
+    return result.matched_count > 0
+
+
+async def save_delivery_progress(job_id, claim_token: str, delivered: Dict) -> bool:
+    """
+    Store partial bundle progress {copy_id: message_id} on the job
+    Retries skip these items
+    
+    Returns:
+        False if the job was claimed by another worker in the meantime
+    """
+    result = await database.delivery_jobs.update_one(
+        {"_id": job_id, "claim_token": claim_token},
+        {"$set": {"delivered": delivered}}
+    )
+    return result.matched_count > 0
+
+
+async def count_delivery_jobs() -> Dict[str, int]:
+    """Job counts by status"""
+    try:
+        counts = await database.delivery_jobs.aggregate([
+            {"$group": {"_id": "$status", "count": {"$sum": 1}}}
+        ]).to_list(length=None)
+        return {c["_id"]: c["count"] for c in counts}
+    except Exception as e:
+        logger.error(f"❌ Failed to count delivery jobs: {e}")
+        return {}
+
+
 # ═══════════════════════════════════════════════════════════════
 # 📢 EXTRA CHANNELS MANAGEMENT (Admin Panel)
 # ═══════════════════════════════════════════════════════════════
 
+# In-memory active channel list, shared version in meta collection
+# Every write bumps the version so other bot instances reload their copy
+EXTRA_CHANNELS_VERSION_KEY = "extra_channels_version"
+_extra_channels_cache: Optional[List[int]] = None
+_extra_channels_version: Optional[int] = None
+_extra_channels_checked_at: float = 0.0
+
+
+async def _get_extra_channels_version() -> int:
+    """Read shared extra channels version"""
+    doc = await database.meta.find_one({"_id": EXTRA_CHANNELS_VERSION_KEY})
+    return doc.get("version", 0) if doc else 0
+
+
+async def _update_extra_channels_cache(channel_id: int, is_active: bool):
+    """
+    Write-through update after a successful channel write
+    Bumps shared version; if another instance changed the list
+    in the meantime, local copy is reloaded on next read
+    """
+    global _extra_channels_version, _extra_channels_checked_at
+    
+    try:
+        doc = await database.meta.find_one_and_update(
+            {"_id": EXTRA_CHANNELS_VERSION_KEY},
+            {"$inc": {"version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        new_version = doc["version"]
+    except Exception as e:
+        logger.error(f"❌ Failed to bump channel version: {e}")
+        new_version = None
+    
+    if _extra_channels_cache is None:
+        return
+    
+    if is_active and channel_id not in _extra_channels_cache:
+        _extra_channels_cache.append(channel_id)
+    elif not is_active and channel_id in _extra_channels_cache:
+        _extra_channels_cache.remove(channel_id)
+    
+    if new_version is not None and _extra_channels_version is not None \
+            and new_version == _extra_channels_version + 1:
+        _extra_channels_version = new_version
+        _extra_channels_checked_at = time.monotonic()
+    else:
+        # Missed someone else's change - force reload
+        _extra_channels_version = None
+
+
 async def add_extra_channel(channel_id: int, channel_name: str = None) -> bool:
     """Add extra force join channel"""
     try:
@@ -243,12 +1034,19 @@ async def add_extra_channel(channel_id: int, channel_name: str = None) -> bool:
             "is_active": True
         }
         
-        await database.extra_channels.update_one(
+        previous = await database.extra_channels.find_one_and_update(
             {"channel_id": channel_id},
             {"$set": channel_data},
-            upsert=True
+            projection={"_id": 0, "is_active": 1},
+            upsert=True,
+            return_document=ReturnDocument.BEFORE
         )
         
+        await _update_extra_channels_cache(channel_id, True)
+        
+        if not (previous or {}).get("is_active"):
+            await inc_stats({"extra_channels": 1})
+        
         logger.info(f"✅ Extra channel added: {channel_id}")
         return True
         
@@ -260,60 +1058,385 @@ async def add_extra_channel(channel_id: int, channel_name: str = None) -> bool:
 async def remove_extra_channel(channel_id: int) -> bool:
     """Remove extra force join channel"""
     try:
-        result = await database.extra_channels.delete_one({"channel_id": channel_id})
-        return result.deleted_count > 0
+        deleted = await database.extra_channels.find_one_and_delete(
+            {"channel_id": channel_id},
+            projection={"_id": 0, "is_active": 1}
+        )
+        
+        if deleted is None:
+            return False
+        
+        await _update_extra_channels_cache(channel_id, False)
+        if deleted.get("is_active"):
+            await inc_stats({"extra_channels": -1})
+        return True
     except Exception as e:
         logger.error(f"❌ Failed to remove channel: {e}")
         return False
 
 
 async def get_extra_channels() -> List[int]:
-    """Get list of all extra force join channels"""
+    """
+    Get list of all extra force join channels
+    
+    Served from memory; the shared version is checked at most every
+    EXTRA_CHANNELS_SYNC_INTERVAL seconds and the list reloaded on change
+    """
+    global _extra_channels_cache, _extra_channels_version, _extra_channels_checked_at
+    
+    now = time.monotonic()
+    if _extra_channels_cache is not None and _extra_channels_version is not None \
+            and now - _extra_channels_checked_at < config.EXTRA_CHANNELS_SYNC_INTERVAL:
+        return list(_extra_channels_cache)
+    
     try:
-        channels = await database.extra_channels.find(
-            {"is_active": True}
-        ).to_list(length=100)
+        version = await _get_extra_channels_version()
+        
+        if _extra_channels_cache is None or version != _extra_channels_version:
+            channels = await database.extra_channels.find(
+                {"is_active": True},
+                {"channel_id": 1}
+            ).to_list(length=100)
+            
+            _extra_channels_cache = [ch["channel_id"] for ch in channels]
+            _extra_channels_version = version
+            logger.info(f"🔄 Extra channels reloaded (version {version}): {len(_extra_channels_cache)}")
+        
+        _extra_channels_checked_at = now
+        return list(_extra_channels_cache)
         
-        return [ch["channel_id"] for ch in channels]
     except Exception as e:
         logger.error(f"❌ Failed to get channels: {e}")
+        return list(_extra_channels_cache or [])
+
+
+async def save_channel_metadata(channel_id: int, metadata: Dict, is_primary: bool = False) -> bool:
+    """
+    Store cached channel info (title, username, invite link, admin status)
+    
+    The primary force join channel is stored with is_primary=True and no
+    is_active flag, so it never shows up as an extra channel.
+    Extra channels are only updated, never re-created after removal.
+    """
+    try:
+        channel_data = dict(metadata)
+        channel_data["channel_id"] = channel_id
+        
+        if is_primary:
+            channel_data["is_primary"] = True
+        
+        await database.extra_channels.update_one(
+            {"channel_id": channel_id},
+            {"$set": channel_data},
+            upsert=is_primary
+        )
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Failed to save channel metadata: {e}")
+        return False
+
+
+async def get_channel_metadata() -> List[Dict]:
+    """Get stored channel info for all known channels"""
+    try:
+        return await database.extra_channels.find(
+            {},
+            {"_id": 0}
+        ).to_list(length=100)
+    except Exception as e:
+        logger.error(f"❌ Failed to get channel metadata: {e}")
         return []
 
 
 async def toggle_channel_status(channel_id: int, is_active: bool) -> bool:
     """Enable/disable extra channel without deleting"""
     try:
-        result = await database.extra_channels.update_one(
+        previous = await database.extra_channels.find_one_and_update(
             {"channel_id": channel_id},
-            {"$set": {"is_active": is_active}}
+            {"$set": {"is_active": is_active}},
+            projection={"_id": 0, "is_active": 1},
+            return_document=ReturnDocument.BEFORE
         )
-        return result.modified_count > 0
+        
+        if previous is None or previous.get("is_active") == is_active:
+            return False
+        
+        await _update_extra_channels_cache(channel_id, is_active)
+        await inc_stats({"extra_channels": int(is_active) - int(bool(previous.get("is_active")))})
+        return True
     except Exception as e:
         logger.error(f"❌ Failed to toggle channel: {e}")
         return False
 
 
+# ═══════════════════════════════════════════════════════════════
+# 🧾 CHANNEL ROSTER (Local Membership Mirror)
+# ═══════════════════════════════════════════════════════════════
+
+async def save_channel_member(channel_id: int, user_id: int, is_member: bool) -> bool:
+    """Record user's membership state in a force join channel"""
+    try:
+        await database.channel_members.update_one(
+            {"channel_id": channel_id, "user_id": user_id},
+            {"$set": {
+                "channel_id": channel_id,
+                "user_id": user_id,
+                "is_member": is_member,
+                "updated_at": datetime.utcnow()
+            }},
+            upsert=True
+        )
+        return True
+    except Exception as e:
+        logger.error(f"❌ Failed to save channel member: {e}")
+        return False
+
+
+def get_channel_members_cursor(since: datetime, batch_size: int = 5000):
+    """
+    Cursor over roster entries updated after `since`
+    Streamed in batches, never loaded all at once
+    """
+    return database.channel_members.find(
+        {"updated_at": {"$gte": since}},
+        {"_id": 0, "channel_id": 1, "user_id": 1, "is_member": 1, "updated_at": 1}
+    ).batch_size(batch_size)
+
+
+# ═══════════════════════════════════════════════════════════════
+# 👥 USERS REGISTRY
+# ═══════════════════════════════════════════════════════════════
+
+# Materialized counters (single document, updated with $inc)
+STATS_ID = "global"
+
+# user_id -> last registry write (monotonic); skips last_seen writes
+# for users seen within USER_SEEN_INTERVAL
+_recently_seen: "OrderedDict[int, float]" = OrderedDict()
+_RECENTLY_SEEN_MAX = 50000
+
+# Fire-and-forget registry writes (referenced until done)
+_pending_registrations: Set["asyncio.Task"] = set()
+
+
+async def register_user(user_id: int, first_name: str = None, username: str = None) -> bool:
+    """
+    Upsert user into the registry (first_seen / last_seen)
+    A newly inserted user increments the unique_users counter
+    
+    Returns:
+        True if this is a new user
+    """
+    now = time.monotonic()
+    seen = _recently_seen.get(user_id)
+    if seen is not None and now - seen < config.USER_SEEN_INTERVAL:
+        return False
+    
+    try:
+        result = await database.users.update_one(
+            {"_id": user_id},
+            {
+                "$set": {
+                    "first_name": first_name,
+                    "username": username,
+                    "last_seen": datetime.utcnow()
+                },
+                "$setOnInsert": {"first_seen": datetime.utcnow()}
+            },
+            upsert=True
+        )
+        
+        _recently_seen[user_id] = now
+        _recently_seen.move_to_end(user_id)
+        while len(_recently_seen) > _RECENTLY_SEEN_MAX:
+            _recently_seen.popitem(last=False)
+        
+        if result.upserted_id is None:
+            return False
+        
+        await inc_stats({"unique_users": 1})
+        logger.info(f"👤 New user registered: {user_id}")
+        return True
+        
+    except Exception as e:
+        logger.error(f"❌ Failed to register user {user_id}: {e}")
+        return False
+
+
+def register_user_later(user_id: int, first_name: str = None, username: str = None):
+    """Register user without making the caller wait for the database"""
+    seen = _recently_seen.get(user_id)
+    if seen is not None and time.monotonic() - seen < config.USER_SEEN_INTERVAL:
+        return
+    
+    task = asyncio.create_task(register_user(user_id, first_name, username))
+    _pending_registrations.add(task)
+    task.add_done_callback(_pending_registrations.discard)
+
+
+async def backfill_users():
+    """
+    One-time import of users known only from user_deliveries (startup)
+    Sets the unique_users counter from the registry afterwards
+    """
+    try:
+        if (await get_meta("users_backfill") or {}).get("done"):
+            return
+        
+        started = time.monotonic()
+        await database.user_deliveries.aggregate(
+            [
+                {"$group": {
+                    "_id": "$user_id",
+                    "first_seen": {"$min": "$delivered_at"},
+                    "last_seen": {"$max": "$delivered_at"}
+                }},
+                {"$merge": {
+                    "into": "users",
+                    "on": "_id",
+                    "whenMatched": "keepExisting",
+                    "whenNotMatched": "insert"
+                }}
+            ],
+            allowDiskUse=True
+        ).to_list(length=None)
+        
+        total = await database.users.count_documents({})
+        await database.stats.update_one(
+            {"_id": STATS_ID},
+            {"$set": {"unique_users": total}},
+            upsert=True
+        )
+        await set_meta("users_backfill", {"done": True, "users": total, "at": datetime.utcnow()})
+        logger.info(f"👥 Users registry backfilled: {total} users in {time.monotonic() - started:.1f}s")
+    
+    except Exception as e:
+        logger.error(f"❌ Users backfill failed: {e}")
+
+
+async def get_unique_user_count() -> int:
+    """Unique users from the counter document (no collection scan)"""
+    doc = await database.stats.find_one({"_id": STATS_ID}, {"unique_users": 1})
+    return (doc or {}).get("unique_users", 0)
+
+
+def get_users_cursor(active_since: datetime = None, batch_size: int = 1000):
+    """
+    Stream registered users (broadcasts, segmentation)
+    
+    Args:
+        active_since: Only users seen at or after this time
+    """
+    query = {"last_seen": {"$gte": active_since}} if active_since else {}
+    return database.users.find(query).batch_size(batch_size)
+
+
 # ═══════════════════════════════════════════════════════════════
 # 📊 STATISTICS
 # ═══════════════════════════════════════════════════════════════
 
+async def inc_stats(deltas: Dict[str, int]):
+    """
+    Apply $inc to the stats document
+    Errors are logged only - drift is fixed by reconcile_stats
+    """
+    deltas = {k: v for k, v in deltas.items() if v}
+    if not deltas:
+        return
+    
+    try:
+        await database.stats.update_one({"_id": STATS_ID}, {"$inc": deltas}, upsert=True)
+    except Exception as e:
+        logger.error(f"❌ Failed to update stats counters: {e}")
+
+
+def _flatten_stats(stats: Dict) -> Dict[str, int]:
+    """Counter fields of the stats document as {dotted.field: value}"""
+    flat = {k: v for k, v in stats.items() if isinstance(v, int)}
+    for content_type, count in (stats.get("content_types") or {}).items():
+        flat[f"content_types.{content_type}"] = count
+    return flat
+
+
+async def reconcile_stats() -> Dict[str, int]:
+    """
+    Recount everything behind the stats document and correct it
+    Catches drift from TTL deletes, failed $inc and other instances
+    
+    Corrections are applied as $inc, so increments made while counting
+    are kept. A counter that changed during its recount is left for the
+    next run (its true value at count time is unknown).
+    
+    Returns:
+        Corrections applied {field: corrected - stored}
+    """
+    started = time.monotonic()
+    before = _flatten_stats(await database.stats.find_one({"_id": STATS_ID}) or {})
+    
+    type_counts = await database.contents.aggregate([
+        {"$group": {"_id": "$content_type", "count": {"$sum": 1}}}
+    ]).to_list(length=None)
+    
+    delivered_contents = await database.user_deliveries.aggregate(
+        [{"$group": {"_id": "$copy_id"}}, {"$count": "count"}],
+        allowDiskUse=True
+    ).to_list(length=1)
+    
+    counters = {
+        "total_contents": sum(t["count"] for t in type_counts),
+        "total_deliveries": await database.user_deliveries.count_documents({}),
+        "unique_users": await database.users.count_documents({}),
+        "extra_channels": await database.extra_channels.count_documents({"is_active": True})
+    }
+    for field in before:
+        if field.startswith("content_types."):
+            counters[field] = 0
+    for t in type_counts:
+        if t["_id"]:
+            counters[f"content_types.{t['_id']}"] = t["count"]
+    
+    after = _flatten_stats(await database.stats.find_one({"_id": STATS_ID}) or {})
+    
+    drift = {}
+    for field, value in counters.items():
+        if before.get(field, 0) != after.get(field, 0):
+            continue
+        if after.get(field, 0) != value:
+            drift[field] = value - after.get(field, 0)
+    
+    update = {"$set": {
+        # Recount-only field - nothing increments it
+        "delivered_contents": delivered_contents[0]["count"] if delivered_contents else 0,
+        "reconciled_at": datetime.utcnow()
+    }}
+    if drift:
+        update["$inc"] = drift
+    
+    await database.stats.update_one({"_id": STATS_ID}, update, upsert=True)
+    
+    logger.info(f"📊 Stats reconciled in {time.monotonic() - started:.1f}s (drift: {drift or 'none'})")
+    return drift
+
+
 async def get_stats() -> Dict:
-    """Get bot statistics"""
+    """Get bot statistics (one read of the stats document)"""
     try:
-        total_contents = await database.contents.count_documents({})
-        total_videos = await database.contents.count_documents({"content_type": "video"})
-        total_links = await database.contents.count_documents({"content_type": "link"})
-        total_deliveries = await database.user_deliveries.count_documents({})
-        unique_users = len(await database.user_deliveries.distinct("user_id"))
-        extra_channels_count = await database.extra_channels.count_documents({"is_active": True})
+        stats = await database.stats.find_one({"_id": STATS_ID}) or {}
+        content_types = stats.get("content_types", {})
+        total_deliveries = stats.get("total_deliveries", 0)
+        unique_users = stats.get("unique_users", 0)
         
         return {
-            "total_contents": total_contents,
-            "total_videos": total_videos,
-            "total_links": total_links,
+            "total_contents": stats.get("total_contents", 0),
+            "total_videos": content_types.get("video", 0),
+            "total_links": content_types.get("link", 0),
             "total_deliveries": total_deliveries,
             "unique_users": unique_users,
-            "extra_channels": extra_channels_count
+            "delivered_contents": stats.get("delivered_contents", 0),
+            "avg_deliveries_per_user": round(total_deliveries / unique_users, 2) if unique_users > 0 else 0,
+            "extra_channels": stats.get("extra_channels", 0),
+            "reconciled_at": stats.get("reconciled_at")
         }
     except Exception as e:
         logger.error(f"❌ Failed to get stats: {e}")
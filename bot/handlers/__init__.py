@@ -17,7 +17,7 @@ def register_handlers(app: Client):
     """
     try:
         # Import all handler modules
-        from bot.handlers import start, content, admin
+        from bot.handlers import throttle, start, content, admin, members
         
         logger.info("✅ All handlers registered successfully!")
         
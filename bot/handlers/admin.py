@@ -19,9 +19,35 @@ from bot.database import (
     add_extra_channel,
     remove_extra_channel,
     get_extra_channels,
-    save_content
+    save_content,
+    count_delivery_jobs,
+    get_content_cache_stats,
+    get_collection_size,
+    get_contents,
+    save_bundle
 )
-from bot.utils.duplicate import get_duplicate_stats
+from bot.utils.duplicate import delivery_write_buffer
+from bot.utils.channel_registry import get_channel_info, refresh_channel, forget_channel
+from bot.utils.rate_limiter import read_limiter, user_throttle
+from bot.utils.sender import send_scheduler, PRIORITY_NOTIFICATION
+from bot.utils.inflight import user_requests
+from bot.utils.backfill import (
+    start_backfill,
+    stop_backfill,
+    is_backfill_running,
+    get_backfill_progress,
+    get_backfill_checkpoint
+)
+from bot.utils.retention import (
+    start_compaction,
+    stop_compaction,
+    is_compaction_running,
+    get_compaction_progress
+)
+from bot.utils.catalog_io import export_contents, import_contents, detect_format
+from functools import partial
+import os
+import tempfile
 import uuid
 
 logger = logging.getLogger(__name__)
@@ -32,6 +58,13 @@ def is_admin(user_id: int) -> bool:
     return user_id == config.ADMIN_ID
 
 
+def format_admin_status(info: dict) -> str:
+    """Short bot admin status marker for channel lists"""
+    if info.get("bot_is_admin") is None:
+        return ""
+    return "✅" if info["bot_is_admin"] else "⚠️ (bot not admin)"
+
+
 # ═══════════════════════════════════════════════════════════════
 # ADMIN COMMANDS
 # ═══════════════════════════════════════════════════════════════
@@ -66,6 +99,12 @@ Welcome to the CineFlix Bot Admin Panel!
 /addchannel - Add force join channel
 /removechannel - Remove channel
 /testcontent - Test content system
+/limits - API rate limiter status
+/bundle - Create multi-item deep link
+/backfill - Index channel history
+/export - Download catalog (CSV / JSONL)
+/retention - Delivery history cleanup
+/import - Import catalog file (reply to file)
 /broadcast - Send broadcast message (coming soon)
 
 ━━━━━━━━━━━━━━━━
@@ -94,11 +133,9 @@ async def show_statistics(client: Client, message: Message, edit: bool = False):
     Can be used for both new messages and edits
     """
     try:
-        # Get general stats
+        # Materialized counters (one document read)
         stats = await get_stats()
-        
-        # Get duplicate prevention stats
-        dup_stats = await get_duplicate_stats()
+        reconciled_at = stats.get("reconciled_at")
         
         stats_text = f"""
 📊 <b>Bot Statistics</b>
@@ -112,7 +149,7 @@ async def show_statistics(client: Client, message: Message, edit: bool = False):
 <b>👥 Users:</b>
 👤 Unique Users: {stats.get('unique_users', 0)}
 📨 Total Deliveries: {stats.get('total_deliveries', 0)}
-📊 Avg per User: {dup_stats.get('avg_deliveries_per_user', 0)}
+📊 Avg per User: {stats.get('avg_deliveries_per_user', 0)}
 
 <b>📢 Channels:</b>
 🔒 Main Channel: <code>{config.FORCE_JOIN_CHANNEL_ID}</code>
@@ -124,7 +161,7 @@ async def show_statistics(client: Client, message: Message, edit: bool = False):
 ✅ Bot: Running
 ✅ Notifications: {'Enabled' if config.ENABLE_NOTIFICATIONS else 'Disabled'}
 
-<i>Last updated: Just now</i>
+<i>Live counters · Last recount: {reconciled_at.strftime('%Y-%m-%d %H:%M') + ' UTC' if reconciled_at else 'pending'}</i>
 """
         
         if edit:
@@ -148,6 +185,63 @@ async def show_statistics(client: Client, message: Message, edit: bool = False):
             await message.reply_text(error_text)
 
 
+@Client.on_message(filters.command("limits") & filters.private)
+async def limits_command(client: Client, message: Message):
+    """Show API rate limiter and send queue state"""
+    if not is_admin(message.from_user.id):
+        await message.reply_text("❌ Unauthorized access.")
+        return
+    
+    limits_text = "🚦 <b>API Rate Limiter</b>\n\n━━━━━━━━━━━━━━━━\n"
+    
+    for method, state in read_limiter.get_state().items():
+        status = f"⛔ Blocked {state['blocked_for']}s" if state["blocked_for"] else "✅ OK"
+        limits_text += (
+            f"\n<b>{method}</b> - {status}\n"
+            f"  Rate: {state['rate']}/{state['base_rate']} per sec\n"
+            f"  Tokens: {state['tokens']}\n"
+            f"  Calls: {state['calls']} | FloodWaits: {state['flood_waits']}\n"
+        )
+    
+    queue = send_scheduler.get_state()
+    limits_text += (
+        f"\n━━━━━━━━━━━━━━━━\n📤 <b>Send Queue</b>\n"
+        f"  Queued: {queue['queued']} | Paused: {queue['paused_for']}s\n"
+        f"  Sent: {queue['sent']} | Failed: {queue['failed']} | FloodWaits: {queue['flood_waits']}\n"
+    )
+    
+    cache = get_content_cache_stats()
+    limits_text += (
+        f"\n🗃 <b>Content Cache</b>\n"
+        f"  Entries: {cache['size']}\n"
+        f"  Hits: {cache['hits']} | Misses: {cache['misses']} | Merged: {cache['merged']}\n"
+    )
+    
+    requests = user_requests.get_state()
+    limits_text += (
+        f"\n🚦 <b>In-Flight Requests</b>\n"
+        f"  Users: {requests['users']} | Active: {requests['active']} | Merged taps: {requests['merged']}\n"
+    )
+    
+    throttle = user_throttle.get_state()
+    limits_text += f"  Throttled: {throttle['throttled']} requests ({throttle['users']} users tracked)\n"
+    
+    buffer = delivery_write_buffer.get_state()
+    limits_text += (
+        f"\n💾 <b>Delivery Write Buffer</b> - {'✅ On' if delivery_write_buffer.running else 'Off'}\n"
+        f"  Pending: {buffer['pending']} | Flushes: {buffer['flushed']} | Failed: {buffer['failed_flushes']}\n"
+    )
+    
+    jobs = await count_delivery_jobs()
+    limits_text += (
+        f"\n📬 <b>Delivery Outbox</b>\n"
+        f"  Pending: {jobs.get('pending', 0)} | Sending: {jobs.get('sending', 0) + jobs.get('sent', 0)}\n"
+        f"  Done: {jobs.get('done', 0)} | Failed: {jobs.get('failed', 0)}\n"
+    )
+    
+    await message.reply_text(limits_text, reply_markup=get_back_keyboard())
+
+
 # ═══════════════════════════════════════════════════════════════
 # CHANNEL MANAGEMENT
 # ═══════════════════════════════════════════════════════════════
@@ -176,13 +270,19 @@ async def add_channel_command(client: Client, message: Message):
         
         # Verify bot has access
         try:
-            chat = await client.get_chat(channel_id)
+            chat = await read_limiter.call("get_chat", client.get_chat, channel_id)
             channel_name = chat.title
             
             # Add to database
             success = await add_extra_channel(channel_id, channel_name)
             
             if success:
+                # Cache title, invite link and admin status
+                try:
+                    await refresh_channel(client, channel_id)
+                except Exception as e:
+                    logger.warning(f"⚠️ Channel info refresh failed for {channel_id}: {e}")
+                
                 await message.reply_text(
                     f"✅ <b>Channel Added Successfully!</b>\n\n"
                     f"📢 <b>Channel:</b> {channel_name}\n"
@@ -224,10 +324,10 @@ async def remove_channel_command(client: Client, message: Message):
         
         channels_text = "📢 <b>Extra Channels:</b>\n\n"
         for ch_id in extra_channels:
-            try:
-                chat = await client.get_chat(ch_id)
-                channels_text += f"• {chat.title} - <code>{ch_id}</code>\n"
-            except:
+            info = get_channel_info(ch_id)
+            if info and info.get("title"):
+                channels_text += f"• {info['title']} - <code>{ch_id}</code>\n"
+            else:
                 channels_text += f"• <code>{ch_id}</code>\n"
         
         channels_text += "\n<b>Usage:</b>\n<code>/removechannel CHANNEL_ID</code>"
@@ -242,6 +342,7 @@ async def remove_channel_command(client: Client, message: Message):
         success = await remove_extra_channel(channel_id)
         
         if success:
+            forget_channel(channel_id)
             await message.reply_text(
                 f"✅ <b>Channel Removed Successfully!</b>\n\n"
                 f"🆔 <b>ID:</b> <code>{channel_id}</code>\n\n"
@@ -263,15 +364,15 @@ async def list_channels_command(client: Client, message: Message):
         return
     
     try:
-        # Main channel
-        main_chat = await client.get_chat(config.FORCE_JOIN_CHANNEL_ID)
+        # Main channel (cached info, no API calls)
+        main_info = get_channel_info(config.FORCE_JOIN_CHANNEL_ID) or {}
         
         channels_text = f"""
 📢 <b>Force Join Channels</b>
 
 ━━━━━━━━━━━━━━━━
 <b>🔒 Main Channel:</b>
-• {main_chat.title}
+• {main_info.get('title') or 'Unknown'} {format_admin_status(main_info)}
 • ID: <code>{config.FORCE_JOIN_CHANNEL_ID}</code>
 • Username: {config.CHANNEL_USERNAME}
 
@@ -284,12 +385,15 @@ async def list_channels_command(client: Client, message: Message):
         
         if extra_channels:
             for ch_id in extra_channels:
-                try:
-                    chat = await client.get_chat(ch_id)
-                    username = f"@{chat.username}" if chat.username else "Private"
-                    channels_text += f"\n• {chat.title}\n  ID: <code>{ch_id}</code>\n  {username}"
-                except Exception as e:
-                    channels_text += f"\n• <code>{ch_id}</code> (Error: {str(e)[:30]})"
+                info = get_channel_info(ch_id)
+                if info:
+                    username = f"@{info['username']}" if info.get("username") else "Private"
+                    channels_text += (
+                        f"\n• {info.get('title') or 'Channel'} {format_admin_status(info)}"
+                        f"\n  ID: <code>{ch_id}</code>\n  {username}"
+                    )
+                else:
+                    channels_text += f"\n• <code>{ch_id}</code> (Info not loaded yet)"
         else:
             channels_text += "\n<i>No extra channels added.</i>"
         
@@ -303,6 +407,333 @@ async def list_channels_command(client: Client, message: Message):
         await message.reply_text("⚠️ Failed to fetch channel list.")
 
 
+# ═══════════════════════════════════════════════════════════════
+# CHANNEL BACKFILL
+# ═══════════════════════════════════════════════════════════════
+
+def format_backfill_progress(progress: dict) -> str:
+    """Backfill progress text"""
+    status_icons = {"running": "🔄", "done": "✅", "stopped": "⏸", "failed": "❌"}
+    status = progress.get("status", "unknown")
+    
+    text = (
+        f"🗂️ <b>Channel Backfill</b> - {status_icons.get(status, '❔')} {status.title()}\n\n"
+        f"📍 Next Message ID: <code>{progress.get('next_message_id')}</code>\n"
+        f"🔎 Scanned: {progress.get('scanned', 0)} IDs ({progress.get('found', 0)} posts)\n"
+        f"✅ Indexed: {progress.get('indexed', 0)}\n"
+        f"♻️ Already indexed: {progress.get('skipped', 0)}\n"
+        f"⚡ Speed: {progress.get('rate', 0)} IDs/sec\n"
+    )
+    
+    if progress.get("elapsed"):
+        text += f"⏱ Time: {progress['elapsed']}s\n"
+    
+    if progress.get("error"):
+        text += f"\n<code>Error: {progress['error']}</code>\n"
+    
+    return text
+
+
+@Client.on_message(filters.command("backfill") & filters.private)
+async def backfill_command(client: Client, message: Message):
+    """
+    Index content channel history
+    
+    /backfill - Start or resume from checkpoint
+    /backfill FROM_ID [TO_ID] - Scan given message ID range
+    /backfill status - Show progress
+    /backfill stop - Stop (resume later)
+    """
+    if not is_admin(message.from_user.id):
+        await message.reply_text("❌ Unauthorized access.")
+        return
+    
+    action = message.command[1].lower() if len(message.command) > 1 else "start"
+    
+    if action == "status":
+        progress = get_backfill_progress()
+        if not progress:
+            checkpoint = await get_backfill_checkpoint() or {}
+            progress = {
+                "status": checkpoint.get("status", "not started"),
+                "next_message_id": checkpoint.get("next_message_id"),
+                "indexed": checkpoint.get("indexed", 0)
+            }
+        await message.reply_text(format_backfill_progress(progress))
+        return
+    
+    if action == "stop":
+        if is_backfill_running():
+            stop_backfill()
+            await message.reply_text("⏸ Backfill will stop after the current page. Use /backfill to resume.")
+        else:
+            await message.reply_text("ℹ️ No backfill is running.")
+        return
+    
+    try:
+        start_id = int(message.command[1]) if action != "start" else None
+        end_id = int(message.command[2]) if len(message.command) > 2 else None
+    except ValueError:
+        await message.reply_text(
+            "🗂️ <b>Channel Backfill</b>\n\n"
+            "<b>Usage:</b>\n"
+            "<code>/backfill</code> - Start / resume\n"
+            "<code>/backfill FROM_ID TO_ID</code> - Scan range\n"
+            "<code>/backfill status</code> - Progress\n"
+            "<code>/backfill stop</code> - Stop"
+        )
+        return
+    
+    status_message = await message.reply_text("🗂️ <b>Channel Backfill</b> - Starting...")
+    
+    async def report(progress: dict):
+        send_scheduler.send_later(
+            status_message.chat.id,
+            partial(status_message.edit_text, format_backfill_progress(progress)),
+            PRIORITY_NOTIFICATION
+        )
+    
+    started = await start_backfill(client, start_id, end_id, on_progress=report)
+    
+    if not started:
+        await status_message.edit_text("⚠️ A backfill is already running. Use /backfill status.")
+    else:
+        logger.info(f"🗂️ Admin started backfill: from {start_id or 'checkpoint'} to {end_id or 'end'}")
+
+
+# ═══════════════════════════════════════════════════════════════
+# DELIVERY RETENTION
+# ═══════════════════════════════════════════════════════════════
+
+def format_size(size: int) -> str:
+    """Bytes to KB / MB text"""
+    if size >= 1024 * 1024:
+        return f"{size / 1024 / 1024:.1f} MB"
+    return f"{size / 1024:.1f} KB"
+
+
+@Client.on_message(filters.command("retention") & filters.private)
+async def retention_command(client: Client, message: Message):
+    """
+    Delivery history retention
+    
+    /retention - Status + collection size
+    /retention run - Trim each user to DELIVERY_KEEP_LAST records now
+    /retention stop - Stop running compaction
+    """
+    if not is_admin(message.from_user.id):
+        await message.reply_text("❌ Unauthorized access.")
+        return
+    
+    action = message.command[1].lower() if len(message.command) > 1 else "status"
+    
+    if action == "run":
+        if start_compaction():
+            await message.reply_text("🧹 Delivery compaction started. Use /retention for progress.")
+            logger.info("🧹 Admin started delivery compaction")
+        else:
+            await message.reply_text("⚠️ Compaction is already running or DELIVERY_KEEP_LAST is 0.")
+        return
+    
+    if action == "stop":
+        if is_compaction_running():
+            stop_compaction()
+            await message.reply_text("⏸ Compaction will stop after the current user.")
+        else:
+            await message.reply_text("ℹ️ No compaction is running.")
+        return
+    
+    size = await get_collection_size("user_deliveries")
+    progress = get_compaction_progress()
+    
+    text = (
+        f"🧹 <b>Delivery Retention</b>\n\n"
+        f"⏳ TTL: {f'{config.DELIVERY_RETENTION_DAYS} days' if config.DELIVERY_RETENTION_DAYS > 0 else 'off'}\n"
+        f"📌 Keep last per user: {config.DELIVERY_KEEP_LAST or 'off'}\n\n"
+        f"<b>user_deliveries:</b>\n"
+        f"  Records: {size.get('count', 0)}\n"
+        f"  Data: {format_size(size.get('size', 0))} | Indexes: {format_size(size.get('index_size', 0))}\n"
+    )
+    
+    if progress:
+        text += (
+            f"\n<b>Last compaction:</b> {progress['status'].title()}\n"
+            f"  Users trimmed: {progress['users']}\n"
+            f"  Records deleted: {progress['deleted']}\n"
+            f"  Reclaimed: ~{format_size(progress['reclaimed_bytes'])}\n"
+        )
+        if progress.get("elapsed"):
+            text += f"  Time: {progress['elapsed']}s\n"
+        if progress.get("error"):
+            text += f"\n<code>Error: {progress['error']}</code>\n"
+    
+    await message.reply_text(text)
+
+
+# ═══════════════════════════════════════════════════════════════
+# CATALOG IMPORT / EXPORT
+# ═══════════════════════════════════════════════════════════════
+
+@Client.on_message(filters.command("export") & filters.private)
+async def export_command(client: Client, message: Message):
+    """
+    Export contents catalog as file
+    
+    /export - CSV
+    /export jsonl - JSON Lines
+    """
+    if not is_admin(message.from_user.id):
+        await message.reply_text("❌ Unauthorized access.")
+        return
+    
+    file_format = message.command[1].lower() if len(message.command) > 1 else "csv"
+    if file_format not in ["csv", "jsonl"]:
+        await message.reply_text(
+            "📤 <b>Export Catalog</b>\n\n"
+            "<b>Usage:</b>\n"
+            "<code>/export</code> - CSV\n"
+            "<code>/export jsonl</code> - JSON Lines"
+        )
+        return
+    
+    status_message = await message.reply_text("📤 Exporting catalog...")
+    fd, path = tempfile.mkstemp(suffix=f".{file_format}", prefix="catalog_")
+    os.close(fd)
+    
+    try:
+        count = await export_contents(path, file_format)
+        
+        await client.send_document(
+            message.chat.id,
+            path,
+            file_name=f"catalog.{file_format}",
+            caption=f"📤 <b>Catalog Export</b>\n\n📚 Contents: {count}"
+        )
+        await status_message.delete()
+        logger.info(f"📤 Admin exported catalog: {count} contents ({file_format})")
+    
+    except Exception as e:
+        logger.error(f"❌ Catalog export failed: {e}")
+        await status_message.edit_text("⚠️ Catalog export failed.")
+    
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+@Client.on_message(filters.command("import") & filters.private)
+async def import_command(client: Client, message: Message):
+    """
+    Import contents catalog from CSV / JSONL file
+    Use as reply to the file (or as file caption)
+    Existing copy_ids are updated, new ones inserted
+    """
+    if not is_admin(message.from_user.id):
+        await message.reply_text("❌ Unauthorized access.")
+        return
+    
+    source = message if message.document else message.reply_to_message
+    document = source.document if source else None
+    file_format = detect_format(document.file_name) if document else None
+    
+    if not file_format:
+        await message.reply_text(
+            "📥 <b>Import Catalog</b>\n\n"
+            "<b>Usage:</b>\n"
+            "Reply to a <code>.csv</code> or <code>.jsonl</code> file with <code>/import</code>\n\n"
+            "<b>Columns:</b>\n"
+            "<code>copy_id, content_type, message_id, message_ids, media_group_id, link, "
+            "channel_id, source_message_id, created_at</code>\n\n"
+            "💡 Use /export to get a file in the right format."
+        )
+        return
+    
+    status_message = await message.reply_text("📥 Importing catalog...")
+    fd, path = tempfile.mkstemp(suffix=f".{file_format}", prefix="catalog_")
+    os.close(fd)
+    
+    try:
+        await client.download_media(source, file_name=path)
+        report = await import_contents(path, file_format)
+        
+        text = (
+            f"📥 <b>Catalog Import</b>\n\n"
+            f"📄 Rows: {report['rows']}\n"
+            f"✅ Inserted / updated: {report['written']}\n"
+            f"❌ Invalid: {report['invalid']}\n"
+            f"⏱ Time: {report['elapsed']}s\n"
+        )
+        if report["errors"]:
+            text += "\n<b>Errors:</b>\n" + "\n".join(f"<code>{e}</code>" for e in report["errors"])
+        
+        await status_message.edit_text(text)
+        logger.info(f"📥 Admin imported catalog: {report['written']} written, {report['invalid']} invalid")
+    
+    except Exception as e:
+        logger.error(f"❌ Catalog import failed: {e}")
+        await status_message.edit_text(f"⚠️ Catalog import failed.\n\n<code>{e}</code>")
+    
+    finally:
+        if os.path.exists(path):
+            os.remove(path)
+
+
+# ═══════════════════════════════════════════════════════════════
+# BUNDLES
+# ═══════════════════════════════════════════════════════════════
+
+@Client.on_message(filters.command("bundle") & filters.private)
+async def bundle_command(client: Client, message: Message):
+    """Create a multi-item deep link from several copy_ids"""
+    if not is_admin(message.from_user.id):
+        await message.reply_text("❌ Unauthorized access.")
+        return
+    
+    if len(message.command) < 3:
+        await message.reply_text(
+            "📦 <b>Create Bundle</b>\n\n"
+            "<b>Usage:</b>\n"
+            "<code>/bundle COPY_ID COPY_ID ...</code>\n\n"
+            "<b>Example:</b>\n"
+            "<code>/bundle abc12345 def67890 ghi13579</code>\n\n"
+            "💡 Items are delivered in the given order with one link."
+        )
+        return
+    
+    # Keep order, drop repeats
+    copy_ids = list(dict.fromkeys(message.command[1:]))
+    
+    if len(copy_ids) > config.BUNDLE_MAX_ITEMS:
+        await message.reply_text(f"❌ A bundle can have at most {config.BUNDLE_MAX_ITEMS} items.")
+        return
+    
+    try:
+        contents = await get_contents(copy_ids)
+        missing = [c for c in copy_ids if c not in contents]
+        
+        if missing:
+            await message.reply_text(
+                "❌ <b>Unknown Copy IDs:</b>\n" + "\n".join(f"<code>{c}</code>" for c in missing)
+            )
+            return
+        
+        bundle_id = str(uuid.uuid4())[:8]
+        await save_bundle(bundle_id, copy_ids)
+        
+        await message.reply_text(
+            f"✅ <b>Bundle Created!</b>\n\n"
+            f"📦 Bundle ID: <code>{bundle_id}</code>\n"
+            f"📚 Items: {len(copy_ids)}\n\n"
+            f"<b>Deep Link:</b>\n"
+            f"https://t.me/{(await client.get_me()).username}?start=bundle_{bundle_id}"
+        )
+        logger.info(f"✅ Admin created bundle: {bundle_id} ({len(copy_ids)} items)")
+    
+    except Exception as e:
+        logger.error(f"❌ Failed to create bundle: {e}")
+        await message.reply_text("⚠️ Failed to create bundle.")
+
+
 # ═══════════════════════════════════════════════════════════════
 # TEST CONTENT
 # ═══════════════════════════════════════════════════════════════
@@ -2,286 +2,644 @@
 """
 📹 Content Delivery Handler
 Handles video and link delivery with duplicate prevention
+Deliveries run through the durable outbox + send scheduler
 """
 
 import logging
-from pyrogram import Client, filters
+from pyrogram import Client, filters, raw, utils
 from pyrogram.types import Message
-from pyrogram.errors import FloodWait, MediaEmpty, MessageIdInvalid
+from pyrogram.errors import MediaEmpty, MessageIdInvalid, RandomIdDuplicate
 from bot.config import config
-from bot.keyboards import get_link_keyboard
-from bot.utils.duplicate import handle_duplicate_prevention
+from bot.payloads import get_link_payload
+from bot.utils.duplicate import handle_duplicate_prevention, handle_bulk_duplicate_prevention
+from bot.utils.sender import (
+    send_scheduler,
+    PRIORITY_DELIVERY,
+    PRIORITY_CONFIRMATION,
+    PRIORITY_NOTIFICATION
+)
+from bot.utils.outbox import delivery_outbox
+from bot.utils.ingest import extract_content, generate_copy_id
+from bot.database import save_content, bulk_save_contents, build_content_document, save_delivery_progress
+from functools import partial
 import asyncio
+from typing import Dict, List, Optional
 
 logger = logging.getLogger(__name__)
 
 
-async def deliver_content(client: Client, message: Message, content: dict, copy_id: str):
+async def deliver_content(client: Client, user_id: int, content: dict, copy_id: str,
+                          reply_to_message_id: int = None) -> dict:
     """
     Main content delivery function
     Handles both video and link content
     
+    Queues a durable delivery job; the outbox worker sends it through
+    the send scheduler, so the handler returns right away
+    
     Args:
         client: Pyrogram client
-        message: User's message
+        user_id: User's Telegram ID
         content: Content data from database
         copy_id: Content identifier
+        reply_to_message_id: User's request message (also part of idempotency key)
+    
+    Returns:
+        Delivery job
     """
-    user_id = message.from_user.id
+    return await delivery_outbox.enqueue(
+        user_id=user_id,
+        copy_id=copy_id,
+        content=content,
+        reply_to_message_id=reply_to_message_id
+    )
+
+
+async def deliver_bundle(client: Client, user_id: int, bundle: dict, contents: dict,
+                         reply_to_message_id: int = None) -> dict:
+    """
+    Queue delivery of all items in a bundle as one job
+    
+    Args:
+        bundle: Bundle data from database
+        contents: {copy_id: content} fetched in one query
+    
+    Returns:
+        Delivery job
+    """
+    items = [
+        {k: v for k, v in contents[copy_id].items() if k != "_id"}
+        for copy_id in bundle["copy_ids"]
+        if copy_id in contents
+    ]
+    
+    if len(items) > config.BUNDLE_MAX_ITEMS:
+        logger.warning(f"⚠️ Bundle {bundle['bundle_id']} has {len(items)} items - only first {config.BUNDLE_MAX_ITEMS} are sent")
+        items = items[:config.BUNDLE_MAX_ITEMS]
+    
+    return await delivery_outbox.enqueue(
+        user_id=user_id,
+        copy_id=f"bundle:{bundle['bundle_id']}",
+        content={"content_type": "bundle", "items": items},
+        reply_to_message_id=reply_to_message_id
+    )
+
+
+# ═══════════════════════════════════════════════════════════════
+# OUTBOX JOB PROCESSING
+# ═══════════════════════════════════════════════════════════════
+
+async def process_delivery_job(client: Client, job: dict) -> Optional[int]:
+    """
+    Send the content of a delivery job
+    
+    Returns:
+        Sent message ID ({copy_id: [message IDs]} for bundles),
+        or None if content can't be delivered
+    
+    Raises:
+        Exception on transient errors (job is retried)
+    """
+    content = job["content"]
+    copy_id = job["copy_id"]
     content_type = content.get("content_type", "video")
     
-    try:
-        if content_type == "video":
-            await deliver_video(client, message, content, copy_id)
-        elif content_type == "link":
-            await deliver_link(client, message, content, copy_id)
-        else:
-            logger.error(f"❌ Unknown content type: {content_type}")
-            await message.reply_text(
-                "⚠️ Unsupported content type.",
-                quote=True
-            )
+    # Same random_ids on every attempt - Telegram rejects repeats
+    random_ids = job.get("random_ids")
     
-    except FloodWait as e:
-        logger.warning(f"⏳ Flood wait: {e.value} seconds")
-        await asyncio.sleep(e.value)
-        # Retry after wait
-        await deliver_content(client, message, content, copy_id)
+    if content_type == "video":
+        return await deliver_video(client, job["user_id"], content, copy_id, job.get("reply_to_message_id"), random_ids)
+    elif content_type == "link":
+        return await deliver_link(client, job["user_id"], content, copy_id, job.get("reply_to_message_id"), random_ids)
+    elif content_type == "bundle":
+        return await deliver_bundle_items(client, job["user_id"], content["items"], job.get("reply_to_message_id"), job)
     
-    except Exception as e:
-        logger.error(f"❌ Content delivery failed: {e}", exc_info=True)
-        await message.reply_text(
-            "⚠️ কন্টেন্ট ডেলিভারি ব্যর্থ হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।\n\n"
-            "<i>Content delivery failed. Please try again.</i>",
-            quote=True
+    logger.error(f"❌ Unknown content type: {content_type}")
+    notify_user(client, job["user_id"], "⚠️ Unsupported content type.", job.get("reply_to_message_id"))
+    return None
+
+
+async def finish_delivery_job(client: Client, job: dict, message_id: int):
+    """Track delivery and confirm to user"""
+    user_id = job["user_id"]
+    content_type = job["content"].get("content_type", "video")
+    
+    if content_type == "bundle":
+        # message_id is {copy_id: [message IDs]} for bundles
+        # (single IDs from progress saved by older versions)
+        deliveries = {
+            copy_id: ids if isinstance(ids, list) else [ids]
+            for copy_id, ids in message_id.items()
+        }
+        await handle_bulk_duplicate_prevention(client, user_id, deliveries)
+        notify_user(
+            client,
+            user_id,
+            f"✅ <b>{len(message_id)} items delivered successfully!</b>\n\n"
+            "🎬 আপনার সব কন্টেন্ট পাঠানো হয়েছে।\n"
+            "<i>All your content has been sent.</i>\n\n"
+            "💡 <b>Note:</b> Forwarding is disabled for security.",
+            job.get("reply_to_message_id")
         )
+        return
+    
+    # Albums return all message IDs
+    message_ids = message_id if isinstance(message_id, list) else None
+    if message_ids:
+        message_id = message_ids[0]
+    
+    # Handle duplicate prevention
+    await handle_duplicate_prevention(client, user_id, job["copy_id"], message_id, message_ids)
+    
+    if content_type == "video":
+        notify_user(
+            client,
+            user_id,
+            "✅ <b>Video delivered successfully!</b>\n\n"
+            "🎬 আপনার ভিডিও পাঠানো হয়েছে।\n"
+            "<i>Your video has been sent.</i>\n\n"
+            "💡 <b>Note:</b> Forwarding is disabled for security.",
+            job.get("reply_to_message_id")
+        )
+
+
+async def fail_delivery_job(client: Client, job: dict):
+    """Tell user delivery failed after all retries"""
+    notify_user(
+        client,
+        job["user_id"],
+        "⚠️ কন্টেন্ট ডেলিভারি ব্যর্থ হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।\n\n"
+        "<i>Content delivery failed. Please try again.</i>",
+        job.get("reply_to_message_id")
+    )
 
 
-async def deliver_video(client: Client, message: Message, content: dict, copy_id: str):
+def notify_user(client: Client, user_id: int, text: str, reply_to_message_id: int = None,
+                priority: int = PRIORITY_CONFIRMATION):
+    """Queue a message to user through the send scheduler"""
+    return send_scheduler.send_later(
+        user_id,
+        partial(client.send_message, user_id, text, reply_to_message_id=reply_to_message_id),
+        priority
+    )
+
+
+async def deliver_video(client: Client, user_id: int, content: dict, copy_id: str,
+                        reply_to_message_id: int = None, random_ids: List[int] = None) -> Optional[int]:
     """
     Deliver video content using copyMessage
     
     Features:
     - Protected content (no forwarding)
-    - Duplicate prevention
     - Direct from content channel
+    
+    Returns:
+        Sent message ID (list of IDs for albums),
+        or None if video can't be delivered
     """
-    user_id = message.from_user.id
     message_id = content.get("message_id")
     channel_id = content.get("channel_id", config.CONTENT_CHANNEL_ID)
     
     if not message_id:
         logger.error(f"❌ No message_id found for video content: {copy_id}")
-        await message.reply_text(
-            "⚠️ Video data is incomplete. Please contact admin.",
-            quote=True
-        )
-        return
+        notify_user(client, user_id, "⚠️ Video data is incomplete. Please contact admin.", reply_to_message_id)
+        return None
     
     try:
-        # Copy video message from content channel
-        sent_message = await client.copy_message(
-            chat_id=user_id,
-            from_chat_id=channel_id,
-            message_id=message_id,
-            protect_content=config.PROTECT_CONTENT  # Disable forwarding
-        )
-        
-        logger.info(f"📹 Video delivered: {copy_id} to user {user_id}")
+        if content.get("message_ids"):
+            # Album: copy the whole media group in one call
+            new_ids = await send_scheduler.submit(
+                user_id,
+                partial(
+                    copy_messages,
+                    client,
+                    user_id,
+                    channel_id,
+                    content["message_ids"],
+                    config.PROTECT_CONTENT,
+                    random_ids
+                ),
+                PRIORITY_DELIVERY
+            )
+            new_ids = [i for i in new_ids if i]
+            
+            if not new_ids:
+                raise MessageIdInvalid()
+            
+            logger.info(f"🖼 Album delivered: {copy_id} ({len(new_ids)} files) to user {user_id}")
+            return new_ids
         
-        # Handle duplicate prevention
-        await handle_duplicate_prevention(
-            client,
+        # Copy video message from content channel (job's random_id: no double send)
+        new_ids = await send_scheduler.submit(
             user_id,
-            copy_id,
-            sent_message.id
+            partial(
+                copy_messages,
+                client,
+                user_id,
+                channel_id,
+                [message_id],
+                config.PROTECT_CONTENT,  # Disable forwarding
+                random_ids
+            ),
+            PRIORITY_DELIVERY
         )
         
-        # Send confirmation message
-        await message.reply_text(
-            "✅ <b>Video delivered successfully!</b>\n\n"
-            "🎬 আপনার ভিডিও পাঠানো হয়েছে।\n"
-            "<i>Your video has been sent.</i>\n\n"
-            "💡 <b>Note:</b> Forwarding is disabled for security.",
-            quote=True
-        )
+        if not new_ids[0]:
+            raise MessageIdInvalid()
+        
+        logger.info(f"📹 Video delivered: {copy_id} to user {user_id}")
+        return new_ids[0]
         
     except MediaEmpty:
         logger.error(f"❌ Media empty for message {message_id}")
-        await message.reply_text(
-            "⚠️ Video not found in channel. It may have been deleted.",
-            quote=True
-        )
+        notify_user(client, user_id, "⚠️ Video not found in channel. It may have been deleted.", reply_to_message_id)
     
     except MessageIdInvalid:
         logger.error(f"❌ Invalid message ID: {message_id}")
-        await message.reply_text(
-            "⚠️ Video reference is invalid. Please contact admin.",
-            quote=True
-        )
+        notify_user(client, user_id, "⚠️ Video reference is invalid. Please contact admin.", reply_to_message_id)
+    
+    return None
 
 
-async def deliver_link(client: Client, message: Message, content: dict, copy_id: str):
+async def deliver_link(client: Client, user_id: int, content: dict, copy_id: str,
+                       reply_to_message_id: int = None, random_ids: List[int] = None) -> Optional[int]:
     """
     Deliver link content with inline button
     
     Features:
     - Clean link presentation
     - Inline button for easy access
-    - Duplicate prevention
+    
+    Returns:
+        Sent message ID, or None if link data is missing
     """
-    user_id = message.from_user.id
     link = content.get("link")
     
     if not link:
         logger.error(f"❌ No link found for content: {copy_id}")
-        await message.reply_text(
-            "⚠️ Link data is incomplete. Please contact admin.",
-            quote=True
-        )
-        return
+        notify_user(client, user_id, "⚠️ Link data is incomplete. Please contact admin.", reply_to_message_id)
+        return None
     
-    try:
-        # Determine link type and create appropriate message
-        link_type = detect_link_type(link)
-        
-        link_message = f"""
-🔗 <b>Link Content Ready!</b>
-
-📎 <b>Link Type:</b> {link_type}
-🌐 <b>URL:</b> <code>{link}</code>
-
-━━━━━━━━━━━━━━━━
-নিচের বাটনে ক্লিক করে লিংক খুলুন।
-<i>Click the button below to open the link.</i>
-"""
-        
-        # Create keyboard with link button
-        keyboard = get_link_keyboard(link, f"🔗 Open {link_type}")
-        
-        # Send link message
-        sent_message = await message.reply_text(
-            link_message,
-            reply_markup=keyboard,
-            quote=True,
-            disable_web_page_preview=True
-        )
-        
-        logger.info(f"🔗 Link delivered: {copy_id} to user {user_id}")
-        
-        # Handle duplicate prevention
-        await handle_duplicate_prevention(
+    # Pre-rendered at ingest: text + entities + keyboard, no HTML parsing
+    payload = get_link_payload(content)
+    
+    # Send link message
+    sent_id = await send_scheduler.submit(
+        user_id,
+        partial(
+            send_text_message,
             client,
             user_id,
-            copy_id,
-            sent_message.id
+            payload["text"],
+            payload["entities"],
+            payload["reply_markup"],
+            reply_to_message_id,
+            random_ids[0] if random_ids else None
+        ),
+        PRIORITY_DELIVERY
+    )
+    
+    logger.info(f"🔗 Link delivered: {copy_id} to user {user_id}")
+    return sent_id
+
+
+async def send_text_message(client: Client, chat_id: int, text: str, entities: list,
+                            reply_markup, reply_to_message_id: int = None,
+                            random_id: int = None) -> Optional[int]:
+    """
+    send_message with a caller-chosen random_id (raw SendMessage)
+    A repeat with the same random_id raises RandomIdDuplicate
+    
+    Returns:
+        New message ID
+    """
+    message, raw_entities = (await utils.parse_text_entities(client, text, None, entities)).values()
+    
+    result = await client.invoke(
+        raw.functions.messages.SendMessage(
+            peer=await client.resolve_peer(chat_id),
+            message=message,
+            random_id=random_id or client.rnd_id(),
+            entities=raw_entities,
+            reply_markup=await reply_markup.write(client) if reply_markup else None,
+            reply_to_msg_id=reply_to_message_id,
+            no_webpage=True
         )
-        
-    except Exception as e:
-        logger.error(f"❌ Link delivery failed: {e}", exc_info=True)
-        await message.reply_text(
-            "⚠️ লিংক পাঠাতে ব্যর্থ হয়েছে।\n"
-            "<i>Failed to send link.</i>",
-            quote=True
+    )
+    
+    if isinstance(result, raw.types.UpdateShortSentMessage):
+        return result.id
+    
+    for update in result.updates:
+        if isinstance(update, raw.types.UpdateMessageID):
+            return update.id
+    return None
+
+
+async def copy_messages(client: Client, chat_id: int, from_chat_id: int,
+                        message_ids: List[int], protect_content: bool = True,
+                        random_ids: List[int] = None) -> List[Optional[int]]:
+    """
+    Copy several messages in one API call
+    (forward without author = copy, up to 100 messages)
+    
+    Args:
+        random_ids: One per message - pass the job's stored ids so a retry
+            of a send that already went out raises RandomIdDuplicate
+    
+    Returns:
+        New message IDs, aligned with message_ids (None if not sent)
+    """
+    if not random_ids or len(random_ids) != len(message_ids):
+        random_ids = [client.rnd_id() for _ in message_ids]
+    
+    result = await client.invoke(
+        raw.functions.messages.ForwardMessages(
+            from_peer=await client.resolve_peer(from_chat_id),
+            to_peer=await client.resolve_peer(chat_id),
+            id=message_ids,
+            random_id=random_ids,
+            drop_author=True,
+            noforwards=protect_content or None
         )
+    )
+    
+    new_ids = {
+        update.random_id: update.id
+        for update in result.updates
+        if isinstance(update, raw.types.UpdateMessageID)
+    }
+    return [new_ids.get(random_id) for random_id in random_ids]
 
 
-def detect_link_type(link: str) -> str:
+async def deliver_bundle_items(client: Client, user_id: int, items: List[dict],
+                               reply_to_message_id: int = None, job: dict = None) -> Optional[Dict[str, List[int]]]:
     """
-    Detect type of link for better presentation
+    Deliver bundle items in order
+    
+    Consecutive videos from the same channel are copied in one batched
+    call; links are sent one message each. Progress is saved on the job
+    after every call, so a retry only sends the items that are left; the
+    job's random_ids make Telegram reject a call that already went out.
     
     Returns:
-        Human-readable link type
+        {copy_id: [message IDs]} of delivered items (all parts for albums),
+        or None if nothing was sent
     """
-    link_lower = link.lower()
-    
-    if "youtube.com" in link_lower or "youtu.be" in link_lower:
-        return "YouTube Video"
-    elif "drive.google.com" in link_lower:
-        return "Google Drive"
-    elif "t.me" in link_lower or "telegram" in link_lower:
-        return "Telegram Link"
-    elif "instagram.com" in link_lower:
-        return "Instagram"
-    elif "facebook.com" in link_lower or "fb.com" in link_lower:
-        return "Facebook"
-    elif "twitter.com" in link_lower or "x.com" in link_lower:
-        return "Twitter/X"
-    elif ".mp4" in link_lower or ".mkv" in link_lower or ".avi" in link_lower:
-        return "Video File"
-    elif ".pdf" in link_lower:
-        return "PDF Document"
-    else:
-        return "External Link"
+    delivered = dict((job or {}).get("delivered") or {})
+    random_ids = (job or {}).get("random_ids") or {}
+    already_sent = None
+    total = len(items)
+    items = [item for item in items if item["copy_id"] not in delivered]
+    index = 0
+    
+    async def save_progress():
+        if job and not await save_delivery_progress(job["_id"], job["claim_token"], delivered):
+            raise RuntimeError("delivery job was claimed by another worker")
+    
+    while index < len(items):
+        item = items[index]
+        
+        if item.get("content_type", "video") != "video":
+            try:
+                message_id = await deliver_link(
+                    client, user_id, item, item["copy_id"], random_ids=random_ids.get(item["copy_id"])
+                )
+            except RandomIdDuplicate as e:
+                # Sent by an earlier attempt (message ID unknown)
+                already_sent = e
+                message_id = None
+            if message_id:
+                delivered[item["copy_id"]] = [message_id]
+                await save_progress()
+            index += 1
+            continue
+        
+        # Group consecutive videos from same channel (max 100 messages per call)
+        channel_id = item.get("channel_id", config.CONTENT_CHANNEL_ID)
+        group = []
+        group_size = 0
+        while index < len(items):
+            candidate = items[index]
+            size = len(candidate.get("message_ids") or [1])
+            if candidate.get("content_type", "video") != "video" or not candidate.get("message_id") \
+                    or candidate.get("channel_id", config.CONTENT_CHANNEL_ID) != channel_id \
+                    or (group and group_size + size > 100):
+                break
+            group.append(candidate)
+            group_size += size
+            index += 1
+        
+        if not group:
+            # Video without message_id - skip it
+            logger.error(f"❌ No message_id found for video content: {item['copy_id']}")
+            index += 1
+            continue
+        
+        # Albums contribute all their messages
+        source_ids = [g.get("message_ids") or [g["message_id"]] for g in group]
+        group_random_ids = [r for g in group for r in random_ids.get(g["copy_id"]) or []]
+        
+        try:
+            new_ids = await send_scheduler.submit(
+                user_id,
+                partial(
+                    copy_messages,
+                    client,
+                    user_id,
+                    channel_id,
+                    [message_id for ids in source_ids for message_id in ids],
+                    config.PROTECT_CONTENT,
+                    group_random_ids
+                ),
+                PRIORITY_DELIVERY
+            )
+        except RandomIdDuplicate as e:
+            # Group was sent by an earlier attempt (message IDs unknown)
+            logger.info(f"♻️ Bundle group already sent to user {user_id} - {len(group)} item(s) skipped")
+            already_sent = e
+            continue
+        
+        position = 0
+        for g, ids in zip(group, source_ids):
+            sent_ids = [i for i in new_ids[position:position + len(ids)] if i]
+            position += len(ids)
+            if sent_ids:
+                delivered[g["copy_id"]] = sent_ids
+        
+        await save_progress()
+    
+    if not delivered:
+        if already_sent:
+            raise already_sent
+        notify_user(client, user_id, "⚠️ Bundle content not found. Please contact admin.", reply_to_message_id)
+        return None
+    
+    logger.info(f"📦 Bundle delivered: {len(delivered)}/{total} items to user {user_id}")
+    return delivered
 
 
 # ═══════════════════════════════════════════════════════════════
 # CONTENT CHANNEL MONITORING (Auto-capture for Admin)
 # ═══════════════════════════════════════════════════════════════
 
-@Client.on_message(filters.chat(config.CONTENT_CHANNEL_ID) & (filters.video | filters.document | filters.text))
+# media_group_id -> album messages collected so far
+_album_buffers: Dict[str, List[Message]] = {}
+
+# New content documents waiting for the next batched write
+_ingest_buffer: List[Dict] = []
+_ingest_flush_task: Optional[asyncio.Task] = None
+
+
+@Client.on_message(filters.chat(config.CONTENT_CHANNEL_ID) & (filters.video | filters.document | filters.photo | filters.text))
 async def content_channel_monitor(client: Client, message: Message):
     """
     Monitor content channel for new uploads
-    Auto-generate copy_id and save to database
-    Notify admin if enabled
+    Auto-generate copy_id and queue for saving
+    Posts are written + notified in batches (see flush_ingest)
     """
     try:
-        from bot.database import save_content
-        import uuid
+        # Albums arrive as separate messages - collect them first
+        # (photos only count as album parts; single photos are not content)
+        if message.media_group_id and (message.video or message.document or message.photo):
+            buffer_album_message(client, message)
+            return
+        
+        # Determine content type
+        extracted = extract_content(message)
+        if not extracted:
+            # Plain text, ignore
+            return
         
         # Generate unique copy_id
-        copy_id = str(uuid.uuid4())[:8]  # Short unique ID
+        copy_id = generate_copy_id()
+        content_type = extracted["content_type"]
+        message_id = extracted["message_id"]
+        link = extracted["link"]
         
-        # Determine content type
-        if message.video or message.document:
-            content_type = "video"
-            message_id = message.id
-            link = None
-            
+        if content_type == "video":
             logger.info(f"📹 New video detected in content channel: Message ID {message_id}")
-        
-        elif message.text:
-            # Check if message contains a link
-            entities = message.entities or []
-            links = [
-                message.text[entity.offset:entity.offset + entity.length]
-                for entity in entities
-                if entity.type == "url"
-            ]
-            
-            if links:
-                content_type = "link"
-                message_id = None
-                link = links[0]  # Take first link
-                
-                logger.info(f"🔗 New link detected in content channel: {link}")
-            else:
-                # Plain text, ignore
-                return
         else:
-            return
+            logger.info(f"🔗 New link detected in content channel: {link}")
         
-        # Save to database
-        await save_content(
-            copy_id=copy_id,
+        queue_ingest(client, build_content_document(
+            copy_id,
             message_id=message_id,
             link=link,
-            content_type=content_type
-        )
+            content_type=content_type,
+            source_message_id=message.id
+        ))
+    
+    except Exception as e:
+        logger.error(f"❌ Content monitoring failed: {e}", exc_info=True)
+
+
+def buffer_album_message(client: Client, message: Message):
+    """Collect album message; first one schedules the flush"""
+    group_id = message.media_group_id
+    
+    if group_id not in _album_buffers:
+        _album_buffers[group_id] = []
+        asyncio.create_task(flush_album(client, group_id))
+    
+    _album_buffers[group_id].append(message)
+
+
+async def flush_album(client: Client, group_id: str):
+    """
+    Queue collected album as one catalog entry
+    Waits ALBUM_COLLECT_WINDOW seconds for all parts to arrive
+    """
+    await asyncio.sleep(config.ALBUM_COLLECT_WINDOW)
+    messages = _album_buffers.pop(group_id, [])
+    
+    if not messages:
+        return
+    
+    try:
+        copy_id = generate_copy_id()
+        message_ids = sorted(m.id for m in messages)
         
-        logger.info(f"✅ Content auto-saved: {copy_id} ({content_type})")
+        queue_ingest(client, build_content_document(
+            copy_id,
+            message_id=message_ids[0],
+            content_type="video",
+            message_ids=message_ids,
+            media_group_id=group_id,
+            source_message_id=message_ids[0]
+        ))
+        
+        logger.info(f"🖼 Album collected: {copy_id} ({len(message_ids)} files)")
+    
+    except Exception as e:
+        logger.error(f"❌ Album save failed: {e}", exc_info=True)
+
+
+def queue_ingest(client: Client, document: Dict):
+    """
+    Add new content to the ingest batch
+    First item opens an INGEST_BATCH_WINDOW window; a full batch flushes right away
+    """
+    global _ingest_flush_task
+    
+    _ingest_buffer.append(document)
+    
+    if len(_ingest_buffer) >= config.INGEST_BATCH_MAX:
+        asyncio.create_task(flush_ingest(client, delay=0))
+    elif _ingest_flush_task is None or _ingest_flush_task.done():
+        _ingest_flush_task = asyncio.create_task(flush_ingest(client))
+
+
+async def flush_ingest(client: Client, delay: float = None):
+    """
+    Save queued contents and notify admin
+    
+    - One item: normal save + single notification (fast path)
+    - Many items: one bulk write + one digest notification
+    """
+    await asyncio.sleep(config.INGEST_BATCH_WINDOW if delay is None else delay)
+    
+    documents = _ingest_buffer[:]
+    _ingest_buffer.clear()
+    
+    if not documents:
+        return
+    
+    try:
+        if len(documents) == 1:
+            doc = documents[0]
+            await save_content(
+                copy_id=doc["copy_id"],
+                message_id=doc["message_id"],
+                link=doc["link"],
+                content_type=doc["content_type"],
+                message_ids=doc.get("message_ids"),
+                media_group_id=doc.get("media_group_id"),
+                source_message_id=doc.get("source_message_id")
+            )
+            
+            logger.info(f"✅ Content auto-saved: {doc['copy_id']} ({doc['content_type']})")
+            
+            if config.ENABLE_NOTIFICATIONS:
+                await notify_admin_new_content(
+                    client, doc["copy_id"], doc["content_type"], doc["message_id"], doc["link"],
+                    album_size=len(doc["message_ids"]) if doc.get("message_ids") else None
+                )
+            return
+        
+        await bulk_save_contents(documents)
+        
+        logger.info(f"✅ Content batch auto-saved: {len(documents)} items")
         
-        # Notify admin if enabled
         if config.ENABLE_NOTIFICATIONS:
-            await notify_admin_new_content(client, copy_id, content_type, message_id, link)
+            await notify_admin_digest(client, documents)
     
     except Exception as e:
-        logger.error(f"❌ Content monitoring failed: {e}", exc_info=True)
+        logger.error(f"❌ Content batch save failed ({len(documents)} items): {e}", exc_info=True)
 
 
 async def notify_admin_new_content(client: Client, copy_id: str, content_type: str, 
-                                   message_id: int = None, link: str = None):
+                                   message_id: int = None, link: str = None, album_size: int = None):
     """
     Send notification to admin about new content
     Includes copy_id for easy Mini App integration
@@ -300,6 +658,9 @@ async def notify_admin_new_content(client: Client, copy_id: str, content_type: s
         if link:
             notification_text += f"🔗 <b>Link:</b> <code>{link}</code>\n"
         
+        if album_size:
+            notification_text += f"🖼 <b>Album:</b> {album_size} files\n"
+        
         notification_text += f"""
 ━━━━━━━━━━━━━━━━
 💡 <b>Next Steps:</b>
@@ -310,12 +671,64 @@ async def notify_admin_new_content(client: Client, copy_id: str, content_type: s
 🎬 Content Channel: {config.CONTENT_CHANNEL_ID}
 """
         
-        await client.send_message(
+        send_scheduler.send_later(
             config.ADMIN_ID,
-            notification_text
+            partial(client.send_message, config.ADMIN_ID, notification_text),
+            PRIORITY_NOTIFICATION
         )
         
-        logger.info(f"📬 Admin notified about new content: {copy_id}")
+        logger.info(f"📬 Admin notification queued for new content: {copy_id}")
     
     except Exception as e:
         logger.error(f"❌ Failed to notify admin: {e}")
+
+
+async def notify_admin_digest(client: Client, documents: List[Dict]):
+    """
+    Send notifications listing every content of an ingest batch
+    Replaces per-post notifications during bulk uploads; long batches are
+    split into parts of INGEST_DIGEST_MAX_LINES lines (and Telegram's size limit)
+    """
+    try:
+        lines = []
+        for doc in documents:
+            if doc.get("message_ids"):
+                detail = f"ALBUM ({len(doc['message_ids'])} files)"
+            elif doc["content_type"] == "link":
+                link = doc["link"]
+                detail = f"LINK {link[:40] + '…' if len(link) > 40 else link}"
+            else:
+                detail = f"VIDEO #{doc['message_id']}"
+            lines.append(f"• <code>{doc['copy_id']}</code> - {detail}")
+        
+        parts = [[]]
+        for line in lines:
+            part = parts[-1]
+            if part and (len(part) >= config.INGEST_DIGEST_MAX_LINES
+                         or sum(len(l) + 1 for l in part) + len(line) > 3500):
+                parts.append([])
+            parts[-1].append(line)
+        
+        for number, part in enumerate(parts, start=1):
+            title = f"🆕 <b>{len(documents)} New Contents Added!</b>"
+            if len(parts) > 1:
+                title += f" <i>(part {number}/{len(parts)})</i>"
+            
+            notification_text = title + "\n\n" + "\n".join(part)
+            if number == len(parts):
+                notification_text += (
+                    f"\n\n━━━━━━━━━━━━━━━━\n"
+                    f"💡 Add these Copy IDs to your Google Sheets / Mini App\n\n"
+                    f"🎬 Content Channel: {config.CONTENT_CHANNEL_ID}"
+                )
+            
+            send_scheduler.send_later(
+                config.ADMIN_ID,
+                partial(client.send_message, config.ADMIN_ID, notification_text),
+                PRIORITY_NOTIFICATION
+            )
+        
+        logger.info(f"📬 Admin digest queued for {len(documents)} new contents ({len(parts)} message(s))")
+    
+    except Exception as e:
+        logger.error(f"❌ Failed to send admin digest: {e}")
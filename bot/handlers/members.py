@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""
+👥 Chat Member Updates
+Keeps membership cache and channel roster in sync with joins/leaves
+"""
+
+import logging
+from pyrogram import Client
+from pyrogram.types import ChatMemberUpdated
+from bot.utils.force_join import invalidate_membership, is_active_member, get_all_required_channels
+from bot.utils.roster import record_membership
+
+logger = logging.getLogger(__name__)
+
+
+@Client.on_chat_member_updated()
+async def chat_member_updated(client: Client, update: ChatMemberUpdated):
+    """
+    Handle join/leave/ban events in channels where bot is admin
+    Drops cached membership and records the new state in the roster
+    """
+    try:
+        member = update.new_chat_member or update.old_chat_member
+        
+        if not member or not member.user:
+            return
+        
+        user_id = member.user.id
+        channel_id = update.chat.id
+        invalidate_membership(user_id, channel_id)
+        
+        # Only mirror channels users must join
+        if channel_id not in await get_all_required_channels():
+            return
+        
+        is_member = is_active_member(update.new_chat_member) if update.new_chat_member else False
+        await record_membership(user_id, channel_id, is_member)
+        
+        logger.debug(f"🧾 Roster updated: User {user_id} - Channel {channel_id} - Member: {is_member}")
+    
+    except Exception as e:
+        logger.error(f"❌ Chat member update failed: {e}")
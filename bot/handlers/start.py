@@ -4,14 +4,18 @@
 Handles /start command and deep links
 """
 
+import asyncio
 import logging
+from functools import partial
 from pyrogram import Client, filters
 from pyrogram.types import Message, CallbackQuery
 from bot.config import config
 from bot.keyboards import get_start_keyboard, get_help_keyboard
-from bot.utils.force_join import check_force_join, send_force_join_message
-from bot.database import get_content
-from bot.handlers.content import deliver_content
+from bot.utils.force_join import check_force_join
+from bot.database import get_content, get_bundle, get_contents, register_user_later
+from bot.handlers.content import deliver_content, deliver_bundle
+from bot.utils.inflight import user_requests
+from bot.utils.sender import send_scheduler, PRIORITY_CONFIRMATION
 
 logger = logging.getLogger(__name__)
 
@@ -20,12 +24,15 @@ logger = logging.getLogger(__name__)
 async def start_command(client: Client, message: Message):
     """
     Handle /start command
-    Supports deep links: /start content_COPY_ID
+    Supports deep links: /start content_COPY_ID, /start bundle_BUNDLE_ID
     """
     try:
         user_id = message.from_user.id
         user_name = message.from_user.first_name
         
+        # Users registry (first_seen / last_seen), written in background
+        register_user_later(user_id, user_name, message.from_user.username)
+        
         # Check for deep link parameter
         if len(message.command) > 1:
             param = message.command[1]
@@ -38,6 +45,14 @@ async def start_command(client: Client, message: Message):
                 # Handle content delivery
                 await handle_content_request(client, message, copy_id)
                 return
+            
+            # Deep link format: bundle_BUNDLE_ID
+            if param.startswith("bundle_"):
+                bundle_id = param.replace("bundle_", "")
+                logger.info(f"📦 Bundle link detected: User {user_id} requesting bundle {bundle_id}")
+                
+                await handle_bundle_request(client, message, bundle_id)
+                return
         
         # Regular /start (no deep link)
         await send_welcome_message(client, message)
@@ -67,28 +82,113 @@ async def send_welcome_message(client: Client, message: Message):
         logger.error(f"❌ Failed to send welcome message: {e}")
 
 
+def reply_later(message: Message, text: str, **kwargs):
+    """
+    Queue a reply through the send scheduler (global + per-chat limits,
+    FloodWait pauses the queue instead of this handler)
+    """
+    return send_scheduler.send_later(
+        message.chat.id,
+        partial(message.reply_text, text, quote=True, **kwargs),
+        PRIORITY_CONFIRMATION
+    )
+
+
+def is_job_pending(job: dict) -> bool:
+    """Job still has to be sent (its in-flight key is released when it settles)"""
+    return bool(job) and job.get("status") not in ["done", "failed"]
+
+
 async def handle_content_request(client: Client, message: Message, copy_id: str):
     """
     Handle content delivery request from deep link
     
     Flow:
-    1. Check force join
-    2. Fetch content from database
+    1. Check force join - content lookup runs meanwhile
+    2. Use fetched content (lookup cancelled if join is required)
     3. Deliver content (video or link)
     4. Handle duplicates
+    
+    Repeated taps while this copy_id is still in flight are dropped;
+    other requests of the same user wait for this one
     """
     user_id = message.from_user.id
-    user_name = message.from_user.first_name
+    
+    if not user_requests.begin(user_id, copy_id):
+        logger.info(f"♻️ Duplicate tap merged: User {user_id} - Content {copy_id}")
+        return
+    
+    queued = False
+    
+    # Speculative lookup, overlapped with the membership check
+    content_task = asyncio.ensure_future(get_content(copy_id))
     
     try:
-        # Step 1: Check force join
-        can_proceed, join_keyboard = await check_force_join(client, user_id)
+        async with user_requests.serialize(user_id):
+            queued = await _process_content_request(client, message, copy_id, content_task)
         
-        if not can_proceed:
-            logger.info(f"🔒 User {user_id} not joined required channels")
-            
-            await message.reply_text(
-                f"""
+    except Exception as e:
+        logger.error(f"❌ Content request failed: {e}", exc_info=True)
+        reply_later(
+            message,
+            "⚠️ কন্টেন্ট ডেলিভারি ব্যর্থ হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।\n\n"
+            "<i>Content delivery failed. Please try again.</i>"
+        )
+    
+    finally:
+        # Gate failed or error - drop speculative work
+        if not content_task.done():
+            content_task.cancel()
+        
+        if not queued:
+            user_requests.end(user_id, copy_id)
+
+
+async def _process_content_request(client: Client, message: Message, copy_id: str,
+                                   content_task: asyncio.Future) -> bool:
+    """
+    Force join gate + delivery for handle_content_request
+    
+    Returns:
+        True if a delivery job is pending
+    """
+    user_id = message.from_user.id
+    
+    # Step 1: Check force join ("I've Joined" button remembers this request)
+    can_proceed, join_keyboard = await check_force_join(client, user_id, f"content_{copy_id}")
+    
+    if not can_proceed:
+        logger.info(f"🔒 User {user_id} not joined required channels")
+        send_join_required(message, join_keyboard)
+        return False
+    
+    # Step 2: Content from database (usually ready by now)
+    content = await content_task
+    
+    if not content:
+        logger.warning(f"⚠️ Content not found: {copy_id}")
+        reply_later(
+            message,
+            "❌ দুঃখিত, এই কন্টেন্ট খুঁজে পাওয়া যায়নি।\n\n"
+            "<i>Sorry, this content was not found.</i>\n\n"
+            "অনুগ্রহ করে সঠিক লিংক ব্যবহার করুন বা Mini App থেকে আবার চেষ্টা করুন।"
+        )
+        return False
+    
+    # Step 3: Deliver content (queued, sent by scheduler)
+    job = await deliver_content(client, user_id, content, copy_id, message.id)
+    
+    logger.info(f"✅ Content {copy_id} queued for user {user_id}")
+    return is_job_pending(job)
+
+
+def send_join_required(message: Message, join_keyboard):
+    """Queue reply with membership required message and join buttons"""
+    user_name = message.from_user.first_name
+    
+    reply_later(
+        message,
+        f"""
 🔒 <b>Channel Membership Required</b>
 
 হ্যালো {user_name}! 👋
@@ -100,55 +200,160 @@ async def handle_content_request(client: Client, message: Message, copy_id: str)
 
 🎬 <b>Official Channel:</b> {config.CHANNEL_USERNAME}
 """,
-                reply_markup=join_keyboard,
-                quote=True
-            )
-            return
-        
-        # Step 2: Fetch content from database
-        content = await get_content(copy_id)
-        
-        if not content:
-            logger.warning(f"⚠️ Content not found: {copy_id}")
-            await message.reply_text(
-                "❌ দুঃখিত, এই কন্টেন্ট খুঁজে পাওয়া যায়নি।\n\n"
-                "<i>Sorry, this content was not found.</i>\n\n"
-                "অনুগ্রহ করে সঠিক লিংক ব্যবহার করুন বা Mini App থেকে আবার চেষ্টা করুন।",
-                quote=True
-            )
-            return
-        
-        # Step 3: Deliver content
-        await deliver_content(client, message, content, copy_id)
-        
-        logger.info(f"✅ Content {copy_id} delivered to user {user_id}")
-        
+        reply_markup=join_keyboard
+    )
+
+
+async def handle_bundle_request(client: Client, message: Message, bundle_id: str):
+    """
+    Handle bundle delivery request from deep link
+    
+    Flow:
+    1. Check force join (once for all items)
+    2. Fetch bundle + all its contents in one query
+    3. Queue one delivery job for all items
+    """
+    user_id = message.from_user.id
+    request_key = f"bundle:{bundle_id}"
+    
+    if not user_requests.begin(user_id, request_key):
+        logger.info(f"♻️ Duplicate tap merged: User {user_id} - Bundle {bundle_id}")
+        return
+    
+    queued = False
+    
+    try:
+        async with user_requests.serialize(user_id):
+            queued = await _process_bundle_request(client, message, bundle_id)
+    
     except Exception as e:
-        logger.error(f"❌ Content request failed: {e}", exc_info=True)
-        await message.reply_text(
+        logger.error(f"❌ Bundle request failed: {e}", exc_info=True)
+        reply_later(
+            message,
             "⚠️ কন্টেন্ট ডেলিভারি ব্যর্থ হয়েছে। অনুগ্রহ করে আবার চেষ্টা করুন।\n\n"
-            "<i>Content delivery failed. Please try again.</i>",
-            quote=True
+            "<i>Content delivery failed. Please try again.</i>"
+        )
+    
+    finally:
+        if not queued:
+            user_requests.end(user_id, request_key)
+
+
+async def _process_bundle_request(client: Client, message: Message, bundle_id: str) -> bool:
+    """
+    Force join gate + delivery for handle_bundle_request
+    
+    Returns:
+        True if a delivery job is pending
+    """
+    user_id = message.from_user.id
+    
+    can_proceed, join_keyboard = await check_force_join(client, user_id, f"bundle_{bundle_id}")
+    
+    if not can_proceed:
+        logger.info(f"🔒 User {user_id} not joined required channels")
+        send_join_required(message, join_keyboard)
+        return False
+    
+    bundle = await get_bundle(bundle_id)
+    contents = await get_contents(bundle["copy_ids"]) if bundle else {}
+    
+    if not contents:
+        logger.warning(f"⚠️ Bundle not found or empty: {bundle_id}")
+        reply_later(
+            message,
+            "❌ দুঃখিত, এই কন্টেন্ট খুঁজে পাওয়া যায়নি।\n\n"
+            "<i>Sorry, this content was not found.</i>\n\n"
+            "অনুগ্রহ করে সঠিক লিংক ব্যবহার করুন বা Mini App থেকে আবার চেষ্টা করুন।"
         )
+        return False
+    
+    job = await deliver_bundle(client, user_id, bundle, contents, message.id)
+    
+    logger.info(f"✅ Bundle {bundle_id} ({len(contents)} items) queued for user {user_id}")
+    return is_job_pending(job)
 
 
 # ═══════════════════════════════════════════════════════════════
 # CALLBACK QUERIES
 # ═══════════════════════════════════════════════════════════════
 
-@Client.on_callback_query(filters.regex("^check_membership$"))
+async def resume_pending_request(client: Client, callback: CallbackQuery, pending_request: str) -> bool:
+    """
+    Deliver the deep link request remembered in the "I've Joined" button
+    Membership was just verified, so no second force join check
+    
+    Args:
+        pending_request: Deep link parameter (content_COPY_ID / bundle_BUNDLE_ID)
+    
+    Returns:
+        True if delivery was queued (or is already in flight)
+    """
+    user_id = callback.from_user.id
+    # Original /start message (join message replies to it)
+    reply_to = callback.message.reply_to_message_id or callback.message.id
+    
+    if pending_request.startswith("content_"):
+        request_key = pending_request.replace("content_", "")
+    elif pending_request.startswith("bundle_"):
+        request_key = f"bundle:{pending_request.replace('bundle_', '')}"
+    else:
+        return False
+    
+    if not user_requests.begin(user_id, request_key):
+        await callback.answer("⏳ Already sending your content...")
+        return True
+    
+    job = None
+    
+    try:
+        async with user_requests.serialize(user_id):
+            if pending_request.startswith("content_"):
+                content = await get_content(request_key)
+                if content:
+                    job = await deliver_content(client, user_id, content, request_key, reply_to)
+            else:
+                bundle = await get_bundle(pending_request.replace("bundle_", ""))
+                contents = await get_contents(bundle["copy_ids"]) if bundle else {}
+                if contents:
+                    job = await deliver_bundle(client, user_id, bundle, contents, reply_to)
+    finally:
+        if not is_job_pending(job):
+            user_requests.end(user_id, request_key)
+    
+    if not job:
+        return False
+    
+    await callback.answer("✅ Verified! Sending your content...")
+    await callback.message.edit_text(
+        "✅ <b>Membership Verified!</b>\n\n"
+        "📤 আপনার কন্টেন্ট পাঠানো হচ্ছে...\n"
+        "<i>Sending your content...</i>"
+    )
+    
+    logger.info(f"✅ Pending request {pending_request} resumed for user {user_id}")
+    return True
+
+
+@Client.on_callback_query(filters.regex("^check_membership(:.+)?$"))
 async def check_membership_callback(client: Client, callback: CallbackQuery):
     """
     Handle "I've Joined" button click
-    Re-check membership and proceed if joined
+    Re-check membership and deliver the remembered request if joined
     """
     user_id = callback.from_user.id
+    pending_request = callback.data.partition(":")[2] or None
     
     try:
-        # Re-check membership
-        can_proceed, join_keyboard = await check_force_join(client, user_id)
+        # Re-check membership (cached "not joined" is verified again)
+        can_proceed, join_keyboard = await check_force_join(
+            client, user_id, pending_request, recheck=True
+        )
         
         if can_proceed:
+            if pending_request and await resume_pending_request(client, callback, pending_request):
+                return
+            
             await callback.answer("✅ Verified! You can now access content.", show_alert=True)
             
             # Try to extract copy_id from original message
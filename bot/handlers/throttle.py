@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+🚧 Request Throttle
+Runs before other handlers (group -1) and drops users who send
+requests faster than USER_THROTTLE_RATE
+"""
+
+import logging
+from typing import Tuple
+from pyrogram import Client, filters
+from pyrogram.types import Message, CallbackQuery
+from bot.config import config
+from bot.utils.rate_limiter import user_throttle
+
+logger = logging.getLogger(__name__)
+
+# Fixed replies - no DB or membership work for throttled requests
+THROTTLED_MESSAGE = (
+    "⏳ আপনি খুব দ্রুত রিকোয়েস্ট পাঠাচ্ছেন। কয়েক সেকেন্ড পর আবার চেষ্টা করুন।\n\n"
+    "<i>Too many requests. Please wait a few seconds and try again.</i>"
+)
+THROTTLED_ALERT = "⏳ Too many requests. Please wait a few seconds."
+
+
+def is_throttled(user_id: int) -> Tuple[bool, bool]:
+    """
+    Returns:
+        (throttled, first_throttled)
+    """
+    if not config.USER_THROTTLE_ENABLED or user_id == config.ADMIN_ID:
+        return False, False
+    
+    allowed, first = user_throttle.allow(user_id)
+    return not allowed, first
+
+
+@Client.on_message(filters.command("start") & filters.private, group=-1)
+async def throttle_start(client: Client, message: Message):
+    """Throttle /start (deep links) before start_command runs"""
+    if not message.from_user:
+        return
+    
+    throttled, first = is_throttled(message.from_user.id)
+    if not throttled:
+        return
+    
+    if first:
+        logger.warning(f"🚧 Throttling user {message.from_user.id}")
+        try:
+            await message.reply_text(THROTTLED_MESSAGE, quote=True)
+        except Exception as e:
+            logger.error(f"❌ Failed to send throttle reply: {e}")
+    
+    message.stop_propagation()
+
+
+@Client.on_callback_query(group=-1)
+async def throttle_callbacks(client: Client, callback: CallbackQuery):
+    """Throttle button clicks before callback handlers run"""
+    throttled, first = is_throttled(callback.from_user.id)
+    if not throttled:
+        return
+    
+    if first:
+        logger.warning(f"🚧 Throttling callbacks of user {callback.from_user.id}")
+    
+    try:
+        # Clears the button spinner; no API work beyond this
+        await callback.answer(THROTTLED_ALERT)
+    except Exception:
+        pass
+    
+    callback.stop_propagation()
@@ -17,13 +17,6 @@ def get_start_keyboard() -> InlineKeyboardMarkup:
     ])
 
 
-def get_link_keyboard(link: str, button_text: str = "🔗 Open Link") -> InlineKeyboardMarkup:
-    """Keyboard for link content"""
-    return InlineKeyboardMarkup([
-        [InlineKeyboardButton(button_text, url=link)]
-    ])
-
-
 def get_admin_keyboard() -> InlineKeyboardMarkup:
     """Admin panel main menu"""
     return InlineKeyboardMarkup([
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+🧾 Delivery Payloads
+Pre-rendered link messages (text + entities + button spec)
+Computed once at ingest, stored on the content document
+"""
+
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+from pyrogram.enums import MessageEntityType
+from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton, MessageEntity
+
+# Ready-to-send payload objects per copy_id
+_payload_cache: "OrderedDict[str, Dict]" = OrderedDict()
+PAYLOAD_CACHE_SIZE = 5000
+
+
+def detect_link_type(link: str) -> str:
+    """
+    Detect type of link for better presentation
+    
+    Returns:
+        Human-readable link type
+    """
+    link_lower = link.lower()
+    
+    if "youtube.com" in link_lower or "youtu.be" in link_lower:
+        return "YouTube Video"
+    elif "drive.google.com" in link_lower:
+        return "Google Drive"
+    elif "t.me" in link_lower or "telegram" in link_lower:
+        return "Telegram Link"
+    elif "instagram.com" in link_lower:
+        return "Instagram"
+    elif "facebook.com" in link_lower or "fb.com" in link_lower:
+        return "Facebook"
+    elif "twitter.com" in link_lower or "x.com" in link_lower:
+        return "Twitter/X"
+    elif ".mp4" in link_lower or ".mkv" in link_lower or ".avi" in link_lower:
+        return "Video File"
+    elif ".pdf" in link_lower:
+        return "PDF Document"
+    else:
+        return "External Link"
+
+
+def _utf16_len(text: str) -> int:
+    """Telegram entity offsets are in UTF-16 code units"""
+    return len(text.encode("utf-16-le")) // 2
+
+
+def _build_text(segments: List[Tuple[str, str]]) -> Dict:
+    """
+    Join (text, style) segments into plain text + entity specs
+    No HTML parsing needed at send time
+    """
+    text = ""
+    entities = []
+    
+    for part, style in segments:
+        if style:
+            entities.append({"type": style, "offset": _utf16_len(text), "length": _utf16_len(part)})
+        text += part
+    
+    return {"text": text, "entities": entities}
+
+
+def render_link_payload(link: str) -> Dict:
+    """
+    Render link delivery message once
+    
+    Returns:
+        {"link_type", "text", "entities", "buttons"} (plain data, stored in MongoDB)
+    """
+    link_type = detect_link_type(link)
+    
+    payload = _build_text([
+        ("🔗 ", None),
+        ("Link Content Ready!", "bold"),
+        ("\n\n📎 ", None),
+        ("Link Type:", "bold"),
+        (f" {link_type}\n🌐 ", None),
+        ("URL:", "bold"),
+        (" ", None),
+        (link, "code"),
+        ("\n\n━━━━━━━━━━━━━━━━\nনিচের বাটনে ক্লিক করে লিংক খুলুন।\n", None),
+        ("Click the button below to open the link.", "italic")
+    ])
+    
+    payload["link_type"] = link_type
+    payload["buttons"] = [[{"text": f"🔗 Open {link_type}", "url": link}]]
+    return payload
+
+
+def get_link_payload(content: Dict) -> Dict:
+    """
+    Ready-to-send objects for a link content
+    
+    Uses stored payload (or renders it for older documents) and
+    caches the built entities / keyboard per copy_id
+    
+    Returns:
+        {"text", "entities", "reply_markup"}
+    """
+    copy_id = content.get("copy_id")
+    cached = _payload_cache.get(copy_id) if copy_id else None
+    
+    if cached is not None:
+        _payload_cache.move_to_end(copy_id)
+        return cached
+    
+    payload = content.get("payload") or render_link_payload(content["link"])
+    
+    ready = {
+        "text": payload["text"],
+        "entities": [
+            MessageEntity(
+                type=MessageEntityType[entity["type"].upper()],
+                offset=entity["offset"],
+                length=entity["length"]
+            )
+            for entity in payload["entities"]
+        ],
+        "reply_markup": InlineKeyboardMarkup([
+            [InlineKeyboardButton(button["text"], url=button["url"]) for button in row]
+            for row in payload["buttons"]
+        ])
+    }
+    
+    if copy_id:
+        _payload_cache[copy_id] = ready
+        while len(_payload_cache) > PAYLOAD_CACHE_SIZE:
+            _payload_cache.popitem(last=False)
+    
+    return ready
+
+
+def forget_payload(copy_id: str):
+    """Drop cached payload (content changed or deleted)"""
+    _payload_cache.pop(copy_id, None)
@@ -7,11 +7,13 @@ from .force_join import (
     check_force_join,
     check_user_membership,
     send_force_join_message,
-    verify_bot_admin_access
+    verify_bot_admin_access,
+    invalidate_membership
 )
 
 from .duplicate import (
     handle_duplicate_prevention,
+    handle_bulk_duplicate_prevention,
     should_send_content,
     cleanup_old_deliveries,
     get_duplicate_stats
@@ -22,7 +24,9 @@ __all__ = [
     'check_user_membership',
     'send_force_join_message',
     'verify_bot_admin_access',
+    'invalidate_membership',
     'handle_duplicate_prevention',
+    'handle_bulk_duplicate_prevention',
     'should_send_content',
     'cleanup_old_deliveries',
     'get_duplicate_stats'
@@ -0,0 +1,266 @@
+# -*- coding: utf-8 -*-
+"""
+🗂️ Channel History Backfill
+Indexes content channel posts missed while the bot was offline
+Walks message IDs in pages, bulk-writes new entries, checkpoints progress
+"""
+
+import asyncio
+import logging
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+from pyrogram import Client
+from pyrogram.errors import FloodWait
+from pyrogram.types import Message
+from bot.config import config
+from bot.database import (
+    build_content_document,
+    bulk_save_contents,
+    get_indexed_sources,
+    get_meta,
+    set_meta
+)
+from bot.utils.ingest import extract_content, generate_copy_id
+from bot.utils.rate_limiter import read_limiter, RateLimited
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_STATE_KEY = "backfill"
+PAGE_SIZE = 200  # Max message IDs per get_messages call
+
+ProgressCallback = Callable[[Dict], Awaitable[None]]
+
+_task: Optional[asyncio.Task] = None
+_stop_requested = False
+_progress: Dict = {}
+
+
+def is_backfill_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def get_backfill_progress() -> Dict:
+    """Current/last run progress (in memory)"""
+    return dict(_progress)
+
+
+def stop_backfill():
+    """Ask running backfill to stop after current page (resumable)"""
+    global _stop_requested
+    _stop_requested = True
+
+
+async def get_backfill_checkpoint() -> Optional[Dict]:
+    """Stored checkpoint from last run"""
+    return await get_meta(BACKFILL_STATE_KEY)
+
+
+async def start_backfill(client: Client, start_id: int = None, end_id: int = None,
+                         on_progress: ProgressCallback = None) -> bool:
+    """
+    Start backfill in background
+    
+    Args:
+        start_id: First message ID (default: continue from checkpoint, else 1)
+        end_id: Last message ID (default: stop after BACKFILL_MAX_EMPTY_PAGES empty pages)
+    
+    Returns:
+        False if a backfill is already running
+    """
+    global _task, _stop_requested
+    
+    if is_backfill_running():
+        return False
+    
+    if start_id is None:
+        checkpoint = await get_backfill_checkpoint() or {}
+        start_id = checkpoint.get("next_message_id", 1)
+        if checkpoint.get("status") != "done":
+            # Unfinished run keeps its range
+            end_id = end_id or checkpoint.get("end_message_id")
+    
+    _stop_requested = False
+    _task = asyncio.create_task(run_backfill(client, start_id, end_id, on_progress))
+    return True
+
+
+async def _fetch_page(client: Client, message_ids: List[int]) -> List[Message]:
+    """get_messages with rate limiting; waits out FloodWait (background task)"""
+    while True:
+        try:
+            messages = await read_limiter.call(
+                "get_messages",
+                client.get_messages,
+                config.CONTENT_CHANNEL_ID,
+                message_ids
+            )
+            return [m for m in messages if m and not m.empty]
+        except FloodWait as e:
+            await asyncio.sleep(e.value)
+        except RateLimited as e:
+            await asyncio.sleep(e.retry_after)
+
+
+async def run_backfill(client: Client, start_id: int, end_id: Optional[int],
+                       on_progress: ProgressCallback = None):
+    """Backfill worker"""
+    global _progress
+    
+    started = time.monotonic()
+    _progress = {
+        "status": "running",
+        "start_message_id": start_id,
+        "end_message_id": end_id,
+        "next_message_id": start_id,
+        "scanned": 0,
+        "found": 0,
+        "indexed": 0,
+        "skipped": 0,
+        "pages": 0,
+        "rate": 0.0
+    }
+    
+    next_id = start_id
+    empty_pages = 0
+    # First message ID after the last non-empty page
+    empty_from = start_id
+    # media_group_id -> album messages not yet complete
+    pending_albums: Dict[str, List[Message]] = {}
+    
+    try:
+        while end_id is None or next_id <= end_id:
+            if _stop_requested:
+                _progress["status"] = "stopped"
+                break
+            
+            page_end = next_id + PAGE_SIZE - 1
+            if end_id is not None:
+                page_end = min(page_end, end_id)
+            
+            messages = await _fetch_page(client, list(range(next_id, page_end + 1)))
+            _progress["scanned"] += page_end - next_id + 1
+            _progress["found"] += len(messages)
+            _progress["pages"] += 1
+            
+            if messages:
+                empty_pages = 0
+                empty_from = page_end + 1
+            else:
+                empty_pages += 1
+            
+            # Past the newest post: this page is the last one
+            exhausted = end_id is None and empty_pages >= config.BACKFILL_MAX_EMPTY_PAGES
+            
+            # Classify posts
+            singles = []
+            for message in messages:
+                if message.media_group_id and (message.video or message.document or message.photo):
+                    pending_albums.setdefault(message.media_group_id, []).append(message)
+                    continue
+                
+                extracted = extract_content(message)
+                if extracted:
+                    singles.append((message.id, extracted))
+            
+            # Albums can only continue into next page if they reach page end
+            ready_albums = {
+                group_id: sorted(m.id for m in group)
+                for group_id, group in pending_albums.items()
+                if max(m.id for m in group) < page_end or page_end == end_id or exhausted
+            }
+            for group_id in ready_albums:
+                pending_albums.pop(group_id)
+            
+            # Skip what's already indexed (one query per page)
+            indexed = await get_indexed_sources(
+                config.CONTENT_CHANNEL_ID,
+                [message_id for message_id, _ in singles] + [i for ids in ready_albums.values() for i in ids],
+                [e["link"] for _, e in singles if e["link"]]
+            )
+            
+            documents = []
+            seen_links = set(indexed["links"])
+            
+            for message_id, extracted in singles:
+                link = extracted["link"]
+                if message_id in indexed["message_ids"] or (link and link in seen_links):
+                    _progress["skipped"] += 1
+                    continue
+                
+                if link:
+                    seen_links.add(link)
+                
+                documents.append(build_content_document(
+                    generate_copy_id(),
+                    message_id=extracted["message_id"],
+                    link=link,
+                    content_type=extracted["content_type"],
+                    source_message_id=message_id
+                ))
+            
+            for group_id, message_ids in ready_albums.items():
+                if indexed["message_ids"].intersection(message_ids):
+                    _progress["skipped"] += 1
+                    continue
+                
+                documents.append(build_content_document(
+                    generate_copy_id(),
+                    message_id=message_ids[0],
+                    content_type="video",
+                    message_ids=message_ids,
+                    media_group_id=group_id,
+                    source_message_id=message_ids[0]
+                ))
+            
+            _progress["indexed"] += await bulk_save_contents(documents)
+            
+            # Checkpoint (never past an unfinished album)
+            next_id = page_end + 1
+            # New posts will land on the empty tail, so the next run starts there
+            resume_id = min(
+                [empty_from if exhausted else next_id]
+                + [min(m.id for m in group) for group in pending_albums.values()]
+            )
+            _progress["next_message_id"] = resume_id
+            _progress["rate"] = round(_progress["scanned"] / max(time.monotonic() - started, 0.001), 1)
+            
+            await set_meta(BACKFILL_STATE_KEY, {
+                "status": "running",
+                "next_message_id": resume_id,
+                "end_message_id": end_id,
+                "indexed": _progress["indexed"],
+                "updated_at": datetime.utcnow()
+            })
+            
+            if on_progress and _progress["pages"] % config.BACKFILL_REPORT_EVERY == 0:
+                await on_progress(get_backfill_progress())
+            
+            if exhausted:
+                break
+        
+        if _progress["status"] == "running":
+            _progress["status"] = "done"
+        
+        await set_meta(BACKFILL_STATE_KEY, {
+            "status": _progress["status"],
+            "next_message_id": _progress["next_message_id"],
+            "end_message_id": end_id,
+            "indexed": _progress["indexed"],
+            "updated_at": datetime.utcnow()
+        })
+    
+    except Exception as e:
+        _progress["status"] = "failed"
+        _progress["error"] = str(e)[:200]
+        logger.error(f"❌ Backfill failed: {e}", exc_info=True)
+    
+    _progress["elapsed"] = round(time.monotonic() - started, 1)
+    logger.info(
+        f"🗂️ Backfill {_progress['status']}: scanned {_progress['scanned']}, "
+        f"indexed {_progress['indexed']}, skipped {_progress['skipped']} "
+        f"in {_progress['elapsed']}s"
+    )
+    
+    if on_progress:
+        await on_progress(get_backfill_progress())
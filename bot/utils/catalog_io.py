@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+"""
+📤 Catalog Import / Export
+Streams the contents collection to/from CSV or JSONL files
+"""
+
+import csv
+import json
+import logging
+import re
+import time
+from datetime import datetime
+from typing import Dict, Iterator, List, Optional, Tuple
+from bot.config import config
+from bot.database import build_content_document, bulk_upsert_contents, get_contents_cursor
+
+logger = logging.getLogger(__name__)
+
+EXPORT_FIELDS = [
+    "copy_id",
+    "content_type",
+    "message_id",
+    "message_ids",
+    "media_group_id",
+    "link",
+    "channel_id",
+    "source_message_id",
+    "created_at"
+]
+
+# Deep link parameter is "content_<copy_id>", max 64 chars of [A-Za-z0-9_-]
+COPY_ID_PATTERN = re.compile(r"^[A-Za-z0-9_-]{1,56}$")
+
+MAX_REPORTED_ERRORS = 10
+
+
+def detect_format(file_name: str) -> Optional[str]:
+    """csv / jsonl from file extension"""
+    name = (file_name or "").lower()
+    if name.endswith(".csv"):
+        return "csv"
+    if name.endswith(".jsonl") or name.endswith(".json"):
+        return "jsonl"
+    return None
+
+
+# ═══════════════════════════════════════════════════════════════
+# EXPORT
+# ═══════════════════════════════════════════════════════════════
+
+def _export_row(doc: Dict) -> Dict:
+    """Flatten content document for CSV"""
+    row = {field: doc.get(field) for field in EXPORT_FIELDS}
+    row["message_ids"] = " ".join(str(i) for i in doc.get("message_ids") or [])
+    row["created_at"] = doc["created_at"].isoformat() if doc.get("created_at") else ""
+    return {k: ("" if v is None else v) for k, v in row.items()}
+
+
+async def export_contents(path: str, file_format: str = "csv") -> int:
+    """
+    Write whole catalog to file, batch by batch
+    
+    Returns:
+        Number of exported contents
+    """
+    count = 0
+    
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = None
+        if file_format == "csv":
+            writer = csv.DictWriter(f, fieldnames=EXPORT_FIELDS)
+            writer.writeheader()
+        
+        async for doc in get_contents_cursor(config.CATALOG_BATCH_SIZE):
+            if writer:
+                writer.writerow(_export_row(doc))
+            else:
+                record = {field: doc[field] for field in EXPORT_FIELDS if doc.get(field) is not None}
+                f.write(json.dumps(record, default=str, ensure_ascii=False) + "\n")
+            count += 1
+    
+    logger.info(f"📤 Exported {count} content(s) as {file_format}")
+    return count
+
+
+# ═══════════════════════════════════════════════════════════════
+# IMPORT
+# ═══════════════════════════════════════════════════════════════
+
+def _read_rows(path: str, file_format: str) -> Iterator[Tuple[int, Optional[Dict], Optional[str]]]:
+    """
+    Stream rows from file
+    
+    Yields:
+        (line_number, row or None, parse error or None)
+    """
+    with open(path, "r", encoding="utf-8-sig", newline="") as f:
+        if file_format == "csv":
+            reader = csv.DictReader(f)
+            for row in reader:
+                yield reader.line_num, row, None
+        else:
+            for line_number, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    yield line_number, json.loads(line), None
+                except ValueError as e:
+                    yield line_number, None, f"invalid JSON ({e})"
+
+
+def _optional_int(value) -> Optional[int]:
+    if value is None or value == "":
+        return None
+    return int(value)
+
+
+def _build_import_document(row: Dict) -> Dict:
+    """
+    Validate row and build content document
+    
+    Raises:
+        ValueError with a short reason
+    """
+    if not isinstance(row, dict):
+        raise ValueError("row is not an object")
+    
+    copy_id = str(row.get("copy_id") or "").strip()
+    if not COPY_ID_PATTERN.match(copy_id):
+        raise ValueError(f"invalid copy_id '{copy_id[:20]}'")
+    
+    content_type = (row.get("content_type") or "video").strip().lower()
+    if content_type not in ["video", "link"]:
+        raise ValueError(f"invalid content_type '{content_type}'")
+    
+    message_id = _optional_int(row.get("message_id"))
+    link = (row.get("link") or "").strip() or None
+    
+    message_ids = row.get("message_ids") or None
+    if isinstance(message_ids, str):
+        message_ids = [int(i) for i in message_ids.split()] or None
+    
+    if content_type == "video" and not message_id:
+        raise ValueError("video without message_id")
+    if content_type == "link" and not link:
+        raise ValueError("link without URL")
+    
+    doc = build_content_document(
+        copy_id,
+        message_id=message_id,
+        link=link,
+        content_type=content_type,
+        message_ids=message_ids,
+        media_group_id=row.get("media_group_id") or None,
+        source_message_id=_optional_int(row.get("source_message_id"))
+    )
+    
+    channel_id = _optional_int(row.get("channel_id"))
+    if channel_id:
+        doc["channel_id"] = channel_id
+    
+    created_at = row.get("created_at")
+    if created_at:
+        doc["created_at"] = datetime.fromisoformat(str(created_at))
+    
+    return doc
+
+
+async def import_contents(path: str, file_format: str) -> Dict:
+    """
+    Import file in chunks of ordered bulk upserts (by copy_id)
+    Invalid rows are skipped and reported
+    
+    Returns:
+        {"rows", "written", "invalid", "errors", "elapsed"}
+    """
+    started = time.monotonic()
+    report = {"rows": 0, "written": 0, "invalid": 0, "errors": []}
+    chunk: List[Dict] = []
+    
+    for line_number, row, error in _read_rows(path, file_format):
+        report["rows"] += 1
+        
+        if error is None:
+            try:
+                chunk.append(_build_import_document(row))
+            except (ValueError, TypeError) as e:
+                error = str(e)
+        
+        if error:
+            report["invalid"] += 1
+            if len(report["errors"]) < MAX_REPORTED_ERRORS:
+                report["errors"].append(f"Row {line_number or report['rows']}: {error}")
+        
+        if len(chunk) >= config.CATALOG_BATCH_SIZE:
+            report["written"] += await bulk_upsert_contents(chunk)
+            chunk = []
+    
+    report["written"] += await bulk_upsert_contents(chunk)
+    report["elapsed"] = round(time.monotonic() - started, 2)
+    
+    logger.info(
+        f"📥 Imported {report['written']} content(s) from {report['rows']} row(s), "
+        f"{report['invalid']} invalid, in {report['elapsed']}s"
+    )
+    return report
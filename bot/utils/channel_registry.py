@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+"""
+📇 Channel Registry
+Cached channel info (title, username, invite link, bot admin status)
+Kept in memory + extra_channels documents, refreshed in background
+"""
+
+import asyncio
+import logging
+from datetime import datetime
+from typing import Dict, Optional
+from pyrogram import Client
+from bot.config import config
+from bot.database import save_channel_metadata, get_channel_metadata
+from bot.utils.force_join import get_all_required_channels, verify_bot_admin_access
+from bot.utils.rate_limiter import read_limiter
+
+logger = logging.getLogger(__name__)
+
+# channel_id -> {title, username, invite_link, bot_is_admin, refreshed_at}
+_registry: Dict[int, Dict] = {}
+
+INVITE_LINK_NAME = "CineFlix Force Join"
+
+
+def get_channel_info(channel_id: int) -> Optional[Dict]:
+    """Get cached channel info (no API calls)"""
+    return _registry.get(channel_id)
+
+
+def forget_channel(channel_id: int):
+    """Drop channel from in-memory registry"""
+    _registry.pop(channel_id, None)
+
+
+async def load_channel_registry():
+    """
+    Load stored channel info from database
+    Called on startup so keyboards work before first refresh
+    """
+    documents = await get_channel_metadata()
+    
+    for doc in documents:
+        if doc.get("title") or doc.get("invite_link"):
+            _registry[doc["channel_id"]] = {
+                "title": doc.get("title"),
+                "username": doc.get("username"),
+                "invite_link": doc.get("invite_link"),
+                "bot_is_admin": doc.get("bot_is_admin"),
+                "refreshed_at": doc.get("refreshed_at")
+            }
+    
+    logger.info(f"📇 Channel registry loaded: {len(_registry)} channel(s)")
+
+
+async def refresh_channel(client: Client, channel_id: int) -> Dict:
+    """
+    Fetch channel info from Telegram and store it
+    
+    Invite link priority:
+    1. Public username link
+    2. Previously stored link
+    3. Chat's primary invite link
+    4. A new named invite link (created once, never exported/revoked)
+    
+    Raises:
+        Exception if channel can't be accessed
+    """
+    chat = await read_limiter.call("get_chat", client.get_chat, channel_id)
+    previous = _registry.get(channel_id, {})
+    
+    if chat.username:
+        invite_link = f"https://t.me/{chat.username}"
+    else:
+        invite_link = previous.get("invite_link") or chat.invite_link
+    
+    if not invite_link:
+        try:
+            link = await read_limiter.call(
+                "create_chat_invite_link",
+                client.create_chat_invite_link,
+                channel_id,
+                name=INVITE_LINK_NAME
+            )
+            invite_link = link.invite_link
+        except Exception as e:
+            logger.warning(f"⚠️ Could not create invite link for {channel_id}: {e}")
+    
+    info = {
+        "title": chat.title or "Channel",
+        "username": chat.username,
+        "invite_link": invite_link,
+        "bot_is_admin": await verify_bot_admin_access(client, channel_id, chat),
+        "refreshed_at": datetime.utcnow()
+    }
+    
+    _registry[channel_id] = info
+    await save_channel_metadata(
+        channel_id,
+        info,
+        is_primary=channel_id == config.FORCE_JOIN_CHANNEL_ID
+    )
+    
+    return info
+
+
+async def refresh_all_channels(client: Client):
+    """Refresh info for all required channels"""
+    channels = await get_all_required_channels()
+    refreshed = 0
+    
+    for channel_id in channels:
+        try:
+            await refresh_channel(client, channel_id)
+            refreshed += 1
+        except Exception as e:
+            logger.error(f"❌ Failed to refresh channel {channel_id}: {e}")
+    
+    logger.info(f"📇 Channel registry refreshed: {refreshed}/{len(channels)} channel(s)")
+
+
+async def channel_registry_loop(client: Client):
+    """Background task: refresh channel registry periodically"""
+    while True:
+        try:
+            await refresh_all_channels(client)
+        except Exception as e:
+            logger.error(f"❌ Channel registry refresh failed: {e}")
+        
+        await asyncio.sleep(config.CHANNEL_REGISTRY_REFRESH_INTERVAL)
@@ -4,17 +4,24 @@
 Ensures users don't receive the same content multiple times
 """
 
+import asyncio
 import logging
+from functools import partial
 from pyrogram import Client
-from pyrogram.errors import MessageDeleteForbidden, MessageIdInvalid
+from pyrogram.errors import FloodWait, MessageDeleteForbidden, MessageIdInvalid
+from bot.config import config
 from bot.database import (
     check_already_delivered,
     mark_as_delivered,
-    remove_previous_delivery,
-    database,
-    get_user_deliveries
+    mark_many_as_delivered,
+    buffer_delivery,
+    count_buffered_deliveries,
+    flush_buffered_deliveries,
+    compact_user_deliveries,
+    get_stats
 )
-from typing import Tuple
+from bot.utils.sender import send_scheduler, PRIORITY_CLEANUP
+from typing import Dict, List, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -23,40 +30,42 @@ async def handle_duplicate_prevention(
     client: Client,
     user_id: int,
     copy_id: str,
-    new_message_id: int
+    new_message_id: int,
+    new_message_ids: List[int] = None
 ) -> bool:
     """
     Handle duplicate content delivery
     
     Strategy:
-    1. Check if user already received this content
-    2. If yes, delete/invalidate previous message
-    3. Mark new message as delivered
+    1. Mark new message as delivered - one atomic upsert that
+       returns the previous delivery record, if any
+       (write-behind buffer when enabled: written later in bulk)
+    2. Queue deletion of the superseded message(s)
     
     Args:
         client: Pyrogram client
         user_id: User's Telegram ID
         copy_id: Content identifier
         new_message_id: New message ID that was just sent
+        new_message_ids: All new message IDs (albums)
     
     Returns:
         True if handled successfully, False otherwise
     """
     try:
-        # Check if already delivered
-        already_delivered = await check_already_delivered(user_id, copy_id)
+        if delivery_write_buffer.running:
+            await delivery_write_buffer.add(user_id, copy_id, new_message_id, new_message_ids)
+            return True
         
-        if already_delivered:
-            logger.info(f"♻️ User {user_id} already received {copy_id}. Handling duplicate...")
-            
-            # Remove previous delivery record
-            removed = await remove_previous_delivery(user_id, copy_id)
-            
-            if removed:
-                logger.info(f"✅ Previous delivery record removed for {copy_id}")
+        previous = await mark_as_delivered(user_id, copy_id, new_message_id, new_message_ids)
         
-        # Mark new message as delivered
-        await mark_as_delivered(user_id, copy_id, new_message_id)
+        if previous:
+            logger.info(f"♻️ User {user_id} already received {copy_id}. Removing previous copy...")
+            queue_message_deletion(
+                client,
+                user_id,
+                superseded_message_ids(previous, new_message_ids or [new_message_id])
+            )
         
         return True
         
@@ -65,24 +74,242 @@ async def handle_duplicate_prevention(
         return False
 
 
-async def delete_previous_message(client: Client, user_id: int, message_id: int) -> bool:
+async def handle_bulk_duplicate_prevention(client: Client, user_id: int, deliveries: Dict[str, List[int]]) -> bool:
+    """
+    Track a batch of deliveries (bundles) in one write
+    Upsert replaces any previous delivery record for each content;
+    superseded messages are queued for deletion
+    
+    Args:
+        deliveries: {copy_id: [new message IDs]} (all parts for albums)
+    """
+    try:
+        if delivery_write_buffer.running:
+            for copy_id, message_ids in deliveries.items():
+                await delivery_write_buffer.add(
+                    user_id, copy_id, message_ids[0], message_ids if len(message_ids) > 1 else None
+                )
+            return True
+        
+        previous = await mark_many_as_delivered(user_id, deliveries)
+        
+        old_ids = []
+        for copy_id, record in previous.items():
+            old_ids.extend(superseded_message_ids(record, deliveries[copy_id]))
+        
+        if old_ids:
+            queue_message_deletion(client, user_id, old_ids)
+        
+        return True
+    except Exception as e:
+        logger.error(f"❌ Bulk duplicate prevention failed: {e}")
+        return False
+
+
+def superseded_message_ids(previous: Dict, new_message_ids: List[int]) -> List[int]:
+    """Message IDs of a previous delivery that are not part of the new one"""
+    old_ids = previous.get("message_ids") or [previous.get("message_id")]
+    return [i for i in old_ids if i and i not in new_message_ids]
+
+
+# ═══════════════════════════════════════════════════════════════
+# WRITE-BEHIND DELIVERY TRACKING
+# ═══════════════════════════════════════════════════════════════
+
+class DeliveryWriteBuffer:
     """
-    Try to delete previous message sent to user
+    Write-behind buffer for delivery records
+    
+    - add() returns at once; the record is visible to check_already_delivered
+      right away and written later in an unordered bulk write
+    - Flushed every DELIVERY_BUFFER_FLUSH_INTERVAL seconds, or as soon as
+      DELIVERY_BUFFER_FLUSH_SIZE records wait (one bulk write per batch)
+    - Backpressure: add() waits while DELIVERY_BUFFER_MAX_PENDING records wait
+    - stop() drains the buffer
+    
+    Records still buffered when the process dies are lost; the messages
+    were sent, only cleanup of their superseded copies is skipped
+    """
+    
+    def __init__(self):
+        self._client: Optional[Client] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._space: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.flushed = 0
+        self.failed_flushes = 0
+    
+    @property
+    def running(self) -> bool:
+        return self._worker is not None and not self._worker.done()
+    
+    def start(self, client: Client):
+        """Start flush worker (no-op if DELIVERY_BUFFER_ENABLED is off)"""
+        if not config.DELIVERY_BUFFER_ENABLED or self.running:
+            return
+        
+        self._client = client
+        self._stopping = False
+        self._wakeup = asyncio.Event()
+        self._space = asyncio.Event()
+        self._space.set()
+        self._worker = asyncio.create_task(self._run())
+        logger.info("💾 Delivery write buffer started")
+    
+    async def add(self, user_id: int, copy_id: str, message_id: int, message_ids: List[int] = None):
+        """Buffer one delivery record"""
+        while count_buffered_deliveries() >= config.DELIVERY_BUFFER_MAX_PENDING:
+            self._space.clear()
+            self._wakeup.set()
+            await self._space.wait()
+        
+        replaced = buffer_delivery(user_id, copy_id, message_id, message_ids)
+        
+        # Re-delivered before the first record was even written
+        if replaced:
+            queue_message_deletion(
+                self._client,
+                user_id,
+                superseded_message_ids(replaced, message_ids or [message_id])
+            )
+        
+        if count_buffered_deliveries() >= config.DELIVERY_BUFFER_FLUSH_SIZE:
+            self._wakeup.set()
+    
+    async def _flush_all(self):
+        """Write everything buffered, one bounded batch at a time"""
+        while count_buffered_deliveries():
+            replaced = await flush_buffered_deliveries(config.DELIVERY_BUFFER_FLUSH_SIZE)
+            self._space.set()
+            
+            for record, previous in replaced:
+                queue_message_deletion(
+                    self._client,
+                    record["user_id"],
+                    superseded_message_ids(previous, record.get("message_ids") or [record["message_id"]])
+                )
+            
+            self.flushed += 1
+    
+    async def _run(self):
+        """Worker loop: wait for size/time trigger → flush (until stop() is called)"""
+        while not self._stopping:
+            try:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=config.DELIVERY_BUFFER_FLUSH_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                
+                self._wakeup.clear()
+                await self._flush_all()
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed_flushes += 1
+                logger.error(f"❌ Delivery buffer flush failed: {e}")
+                await asyncio.sleep(config.DELIVERY_BUFFER_FLUSH_INTERVAL)
+    
+    async def stop(self):
+        """
+        Stop worker and write remaining records
+        The worker is never cancelled mid-flush - it finishes the
+        current batch and exits, then the rest is drained here
+        """
+        if self._worker:
+            self._stopping = True
+            self._wakeup.set()
+            await self._worker
+        
+        for attempt in range(3):
+            try:
+                await self._flush_all()
+                break
+            except Exception as e:
+                logger.error(f"❌ Delivery buffer drain failed (attempt {attempt + 1}): {e}")
+                await asyncio.sleep(1)
+        
+        if count_buffered_deliveries():
+            logger.warning(f"⚠️ {count_buffered_deliveries()} delivery records not written on shutdown")
+        
+        if self._space:
+            self._space.set()
+    
+    def get_state(self) -> Dict:
+        return {
+            "pending": count_buffered_deliveries(),
+            "flushed": self.flushed,
+            "failed_flushes": self.failed_flushes
+        }
+
+
+# Global write buffer
+delivery_write_buffer = DeliveryWriteBuffer()
+
+
+# ═══════════════════════════════════════════════════════════════
+# SUPERSEDED MESSAGE DELETION (batched, low priority)
+# ═══════════════════════════════════════════════════════════════
+
+# user_id -> message IDs waiting for deletion
+_pending_deletions: Dict[int, List[int]] = {}
+_deletion_flush_task: Optional[asyncio.Task] = None
+
+
+def queue_message_deletion(client: Client, user_id: int, message_ids: List[int]):
+    """
+    Queue old messages for deletion
+    Collected for DELETE_BATCH_WINDOW seconds, then deleted with one
+    call per chat through the send scheduler (lowest priority)
+    """
+    global _deletion_flush_task
+    
+    if not message_ids:
+        return
+    
+    _pending_deletions.setdefault(user_id, []).extend(message_ids)
+    
+    if _deletion_flush_task is None or _deletion_flush_task.done():
+        _deletion_flush_task = asyncio.create_task(flush_message_deletions(client))
+
+
+async def flush_message_deletions(client: Client):
+    """Hand queued deletions to the send scheduler, max 100 IDs per call"""
+    await asyncio.sleep(config.DELETE_BATCH_WINDOW)
+    
+    pending = dict(_pending_deletions)
+    _pending_deletions.clear()
+    
+    for user_id, message_ids in pending.items():
+        for i in range(0, len(message_ids), 100):
+            send_scheduler.send_later(
+                user_id,
+                partial(delete_previous_message, client, user_id, message_ids[i:i + 100]),
+                PRIORITY_CLEANUP
+            )
+
+
+async def delete_previous_message(client: Client, user_id: int, message_ids: List[int]) -> bool:
+    """
+    Try to delete previous messages sent to user
     
     Note: This may fail if:
-    - Message is too old
+    - Message is too old (48h limit for bots)
     - User deleted it already
     - Bot doesn't have permission
     """
     try:
-        await client.delete_messages(user_id, message_id)
-        logger.info(f"🗑️ Deleted previous message {message_id} from user {user_id}")
+        await client.delete_messages(user_id, message_ids)
+        logger.info(f"🗑️ Deleted previous message(s) {message_ids} from user {user_id}")
         return True
+    except FloodWait:
+        raise  # Scheduler pauses and retries
     except (MessageDeleteForbidden, MessageIdInvalid) as e:
-        logger.warning(f"⚠️ Could not delete message {message_id}: {e}")
+        logger.warning(f"⚠️ Could not delete messages {message_ids}: {e}")
         return False
     except Exception as e:
-        logger.error(f"❌ Failed to delete message: {e}")
+        logger.error(f"❌ Failed to delete messages: {e}")
         return False
 
 
@@ -108,61 +335,44 @@ async def should_send_content(user_id: int, copy_id: str) -> Tuple[bool, str]:
         return True, "Error in check, allowing delivery"
 
 
-async def cleanup_old_deliveries(user_id: int, keep_last: int = 100):
+async def cleanup_old_deliveries(user_id: int, keep_last: int = 100) -> int:
     """
     Clean up old delivery records for a user
-    Keeps only the most recent deliveries
+    Keeps only the most recent deliveries (sorted and deleted on the server)
     
     Args:
         user_id: User's Telegram ID
         keep_last: Number of recent deliveries to keep
+    
+    Returns:
+        Number of deleted records
     """
     try:
-        # Get all deliveries for user
-        deliveries = await get_user_deliveries(user_id, limit=1000)
-        
-        if len(deliveries) <= keep_last:
-            return  # No cleanup needed
-        
-        # Sort by delivered_at and keep only recent ones
-        deliveries.sort(key=lambda x: x["delivered_at"], reverse=True)
-        to_delete = deliveries[keep_last:]
+        deleted = await compact_user_deliveries(user_id, keep_last)
         
-        # Delete old records
-        delete_ids = [d["_id"] for d in to_delete]
-        result = await database.user_deliveries.delete_many(
-            {"_id": {"$in": delete_ids}}
-        )
-        
-        logger.info(f"🧹 Cleaned up {result.deleted_count} old delivery records for user {user_id}")
+        if deleted:
+            logger.info(f"🧹 Cleaned up {deleted} old delivery records for user {user_id}")
+        return deleted
         
     except Exception as e:
         logger.error(f"❌ Failed to cleanup deliveries: {e}")
+        return 0
 
 
 async def get_duplicate_stats() -> dict:
     """
     Get statistics about duplicate prevention
     Useful for admin monitoring
+    Read from the stats document (unique_contents is refreshed by reconcile)
     """
     try:
-        # Total deliveries
-        total = await database.user_deliveries.count_documents({})
-        
-        # Unique users
-        unique_users = len(await database.user_deliveries.distinct("user_id"))
-        
-        # Unique contents
-        unique_contents = len(await database.user_deliveries.distinct("copy_id"))
-        
-        # Average deliveries per user
-        avg_per_user = total / unique_users if unique_users > 0 else 0
+        stats = await get_stats()
         
         return {
-            "total_deliveries": total,
-            "unique_users": unique_users,
-            "unique_contents": unique_contents,
-            "avg_deliveries_per_user": round(avg_per_user, 2)
+            "total_deliveries": stats.get("total_deliveries", 0),
+            "unique_users": stats.get("unique_users", 0),
+            "unique_contents": stats.get("delivered_contents", 0),
+            "avg_deliveries_per_user": stats.get("avg_deliveries_per_user", 0)
         }
         
     except Exception as e:
@@ -4,33 +4,145 @@
 Ensures users join required channels before accessing content
 """
 
+import asyncio
 import logging
-from typing import List, Tuple
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import List, Optional, Tuple
 from pyrogram import Client
-from pyrogram.types import InlineKeyboardMarkup, InlineKeyboardButton
+from pyrogram.types import Chat, InlineKeyboardMarkup, InlineKeyboardButton
 from pyrogram.errors import UserNotParticipant, ChatAdminRequired, ChannelPrivate
 from bot.config import config
 from bot.database import get_extra_channels
+from bot.utils.roster import get_roster_membership, record_membership_later
+from bot.utils.rate_limiter import read_limiter, RateLimited
+from bot.utils.sender import send_scheduler, PRIORITY_CONFIRMATION
 
 logger = logging.getLogger(__name__)
 
 
-async def check_user_membership(client: Client, user_id: int, channel_id: int) -> bool:
+# ═══════════════════════════════════════════════════════════════
+# 🧠 MEMBERSHIP CACHE
+# ═══════════════════════════════════════════════════════════════
+
+# (user_id, channel_id) -> (is_member, expires_at)
+_membership_cache: "OrderedDict[Tuple[int, int], Tuple[bool, float]]" = OrderedDict()
+
+
+def get_cached_membership(user_id: int, channel_id: int) -> Optional[bool]:
+    """
+    Get cached membership result
+    
+    Returns:
+        True/False if a fresh entry exists, None on miss or expiry
+    """
+    key = (user_id, channel_id)
+    entry = _membership_cache.get(key)
+    
+    if entry is None:
+        return None
+    
+    is_member, expires_at = entry
+    if expires_at <= time.monotonic():
+        _membership_cache.pop(key, None)
+        return None
+    
+    _membership_cache.move_to_end(key)
+    return is_member
+
+
+def cache_membership(user_id: int, channel_id: int, is_member: bool):
+    """
+    Store membership result
+    Positive and negative results use separate TTLs
+    Least recently used entries are evicted once the size cap is reached
+    """
+    ttl = config.MEMBERSHIP_CACHE_POSITIVE_TTL if is_member else config.MEMBERSHIP_CACHE_NEGATIVE_TTL
+    if ttl <= 0:
+        return
+    
+    key = (user_id, channel_id)
+    _membership_cache[key] = (is_member, time.monotonic() + ttl)
+    _membership_cache.move_to_end(key)
+    
+    while len(_membership_cache) > config.MEMBERSHIP_CACHE_MAX_SIZE:
+        _membership_cache.popitem(last=False)
+
+
+def invalidate_membership(user_id: int, channel_id: Optional[int] = None):
+    """
+    Drop cached membership for a user
+    Called on chat member updates so joins/leaves take effect immediately
+    
+    Args:
+        channel_id: Only drop this channel (all channels if None)
+    """
+    if channel_id is not None:
+        _membership_cache.pop((user_id, channel_id), None)
+        return
+    
+    for key in [k for k in _membership_cache if k[0] == user_id]:
+        _membership_cache.pop(key, None)
+
+
+def is_active_member(member) -> bool:
+    """
+    Check ChatMember status (enum in Pyrogram 2, string in older versions)
+    
+    Returns:
+        True if user is currently in the channel
+    """
+    status = getattr(member.status, "value", member.status)
+    
+    if status == "restricted":
+        return bool(getattr(member, "is_member", True))
+    
+    return status not in ["kicked", "banned", "left"]
+
+
+async def check_user_membership(client: Client, user_id: int, channel_id: int,
+                                recheck: bool = False) -> bool:
     """
     Check if user is member of a channel
     
+    Lookup order:
+    1. Membership cache
+    2. Local channel roster (join/leave events)
+    3. get_chat_member API call (unknown or stale users only)
+    
+    Args:
+        recheck: User says they joined - don't trust cached "not joined"
+    
     Returns:
         True if user is member, False otherwise
     """
+    cached = get_cached_membership(user_id, channel_id)
+    if cached is not None and (cached or not recheck):
+        return cached
+    
+    known = get_roster_membership(user_id, channel_id)
+    if known is not None and (known or not recheck):
+        cache_membership(user_id, channel_id, known)
+        return known
+    
     try:
-        member = await client.get_chat_member(channel_id, user_id)
+        member = await read_limiter.call("get_chat_member", client.get_chat_member, channel_id, user_id)
         # Check if user is member (not kicked/banned)
-        return member.status not in ["kicked", "banned", "left"]
+        is_member = is_active_member(member)
+        cache_membership(user_id, channel_id, is_member)
+        record_membership_later(user_id, channel_id, is_member)
+        return is_member
     except UserNotParticipant:
+        cache_membership(user_id, channel_id, False)
+        record_membership_later(user_id, channel_id, False)
         return False
     except (ChatAdminRequired, ChannelPrivate) as e:
         logger.error(f"❌ Bot access error for channel {channel_id}: {e}")
         return True  # Allow access if bot can't check (configuration issue)
+    except RateLimited as e:
+        logger.warning(f"🚦 Membership check skipped for {channel_id}: {e}")
+        return True  # Allow instead of stalling while rate limited
     except Exception as e:
         logger.error(f"❌ Membership check failed for {channel_id}: {e}")
         return True  # Allow on error to prevent blocking all users
@@ -50,49 +162,124 @@ async def get_all_required_channels() -> List[int]:
     return channels
 
 
-async def check_all_channels(client: Client, user_id: int) -> Tuple[bool, List[int]]:
+async def _check_membership_bounded(client: Client, user_id: int, channel_id: int,
+                                    semaphore: asyncio.Semaphore, recheck: bool = False) -> Tuple[int, bool]:
+    """
+    Single membership check with concurrency limit and timeout
+    Timeouts allow access, same as other API errors
+    """
+    async with semaphore:
+        try:
+            is_member = await asyncio.wait_for(
+                check_user_membership(client, user_id, channel_id, recheck),
+                timeout=config.MEMBERSHIP_CHECK_TIMEOUT
+            )
+            return channel_id, is_member
+        except asyncio.TimeoutError:
+            logger.warning(f"⏳ Membership check timed out for {channel_id}")
+            return channel_id, True
+
+
+async def check_all_channels(client: Client, user_id: int, fail_fast: bool = False,
+                             recheck: bool = False) -> Tuple[bool, List[int]]:
     """
     Check user membership in all required channels
     
+    Cached results are used first, remaining channels are checked
+    concurrently (bounded) when MEMBERSHIP_CHECK_CONCURRENT is enabled
+    
+    Args:
+        fail_fast: Return at the first not-joined channel
+        recheck: Verify cached "not joined" channels again ("I've Joined" button)
+    
     Returns:
         (all_joined, not_joined_channels)
     """
     required_channels = await get_all_required_channels()
     not_joined = []
+    pending = []
     
     for channel_id in required_channels:
-        is_member = await check_user_membership(client, user_id, channel_id)
-        if not is_member:
+        cached = get_cached_membership(user_id, channel_id)
+        if cached is None or (recheck and not cached):
+            pending.append(channel_id)
+        elif not cached:
             not_joined.append(channel_id)
     
+    if fail_fast and not_joined:
+        return False, not_joined
+    
+    if not config.MEMBERSHIP_CHECK_CONCURRENT or len(pending) <= 1:
+        for channel_id in pending:
+            is_member = await check_user_membership(client, user_id, channel_id, recheck)
+            if not is_member:
+                not_joined.append(channel_id)
+                if fail_fast:
+                    break
+    else:
+        semaphore = asyncio.Semaphore(max(1, config.MEMBERSHIP_CHECK_CONCURRENCY))
+        tasks = [
+            asyncio.create_task(_check_membership_bounded(client, user_id, channel_id, semaphore, recheck))
+            for channel_id in pending
+        ]
+        
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                channel_id, is_member = await next_done
+                if not is_member:
+                    not_joined.append(channel_id)
+                    if fail_fast:
+                        break
+        finally:
+            # Answer can no longer change - drop remaining checks
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+        
+        # Keep join buttons in configured channel order
+        not_joined.sort(key=required_channels.index)
+    
     all_joined = len(not_joined) == 0
     return all_joined, not_joined
 
 
-async def create_force_join_keyboard(client: Client, not_joined_channels: List[int]) -> InlineKeyboardMarkup:
+def build_check_membership_data(pending_request: Optional[str] = None) -> str:
+    """
+    Callback data for "I've Joined" button
+    Carries the requested deep link parameter (e.g. content_abc12345)
+    so it can be delivered right after verification
+    """
+    data = f"check_membership:{pending_request}" if pending_request else "check_membership"
+    
+    # Telegram limit: 64 bytes - fall back to plain re-check
+    if len(data.encode()) > 64:
+        return "check_membership"
+    return data
+
+
+async def create_force_join_keyboard(client: Client, not_joined_channels: List[int],
+                                     pending_request: Optional[str] = None) -> InlineKeyboardMarkup:
     """
     Create inline keyboard with join buttons for channels
     
     Args:
         not_joined_channels: List of channel IDs user hasn't joined
+        pending_request: Deep link parameter to resume after joining
     """
+    from bot.utils.channel_registry import get_channel_info, refresh_channel
+    
     buttons = []
     
     for channel_id in not_joined_channels:
         try:
-            # Get channel info
-            chat = await client.get_chat(channel_id)
-            channel_name = chat.title or "Channel"
+            # Cached channel info (no API calls once registry is warm)
+            info = get_channel_info(channel_id)
             
-            # Create invite link
-            if chat.username:
-                invite_link = f"https://t.me/{chat.username}"
-            else:
-                # Try to get invite link
-                try:
-                    invite_link = await client.export_chat_invite_link(channel_id)
-                except:
-                    invite_link = None
+            if info is None:
+                info = await refresh_channel(client, channel_id)
+            
+            invite_link = info.get("invite_link")
+            channel_name = info.get("title") or "Channel"
             
             if invite_link:
                 buttons.append([
@@ -108,7 +295,7 @@ async def create_force_join_keyboard(client: Client, not_joined_channels: List[i
     buttons.append([
         InlineKeyboardButton(
             "✅ আমি জয়েন করেছি / I've Joined",
-            callback_data="check_membership"
+            callback_data=build_check_membership_data(pending_request)
         )
     ])
     
@@ -133,26 +320,31 @@ async def send_force_join_message(client: Client, user_id: int, not_joined_chann
 """
     
     try:
-        await client.send_message(
+        send_scheduler.send_later(
             user_id,
-            message_text,
-            reply_markup=keyboard
+            partial(client.send_message, user_id, message_text, reply_markup=keyboard),
+            PRIORITY_CONFIRMATION
         )
     except Exception as e:
         logger.error(f"❌ Failed to send force join message: {e}")
 
 
-async def verify_bot_admin_access(client: Client, channel_id: int) -> bool:
+async def verify_bot_admin_access(client: Client, channel_id: int, chat: Optional[Chat] = None) -> bool:
     """
     Verify bot has admin access to channel
     Needed for membership checking
+    
+    Args:
+        chat: Already fetched chat (skips get_chat, only used for logging)
     """
     try:
-        chat = await client.get_chat(channel_id)
-        member = await client.get_chat_member(channel_id, "me")
+        if chat is None:
+            chat = await read_limiter.call("get_chat", client.get_chat, channel_id)
+        member = await read_limiter.call("get_chat_member", client.get_chat_member, channel_id, "me")
         
-        # Bot must be admin or creator
-        if member.status in ["administrator", "creator"]:
+        # Bot must be admin or creator (status is an enum in Pyrogram 2)
+        status = getattr(member.status, "value", member.status)
+        if status in ["administrator", "owner", "creator"]:
             logger.info(f"✅ Bot has admin access to channel: {chat.title}")
             return True
         else:
@@ -164,20 +356,30 @@ async def verify_bot_admin_access(client: Client, channel_id: int) -> bool:
         return False
 
 
-async def check_force_join(client: Client, user_id: int) -> Tuple[bool, InlineKeyboardMarkup]:
+async def check_force_join(client: Client, user_id: int, pending_request: Optional[str] = None,
+                           recheck: bool = False) -> Tuple[bool, InlineKeyboardMarkup]:
     """
     Main force join check function
     
+    Args:
+        pending_request: Deep link parameter kept in the "I've Joined" button
+        recheck: Verify cached "not joined" results again
+    
     Returns:
         (can_proceed, join_keyboard_if_needed)
     """
     # Check all required channels
-    all_joined, not_joined = await check_all_channels(client, user_id)
+    all_joined, not_joined = await check_all_channels(
+        client,
+        user_id,
+        fail_fast=config.FORCE_JOIN_FAIL_FAST,
+        recheck=recheck
+    )
     
     if all_joined:
         return True, None
     
     # Create keyboard for channels user hasn't joined
-    keyboard = await create_force_join_keyboard(client, not_joined)
+    keyboard = await create_force_join_keyboard(client, not_joined, pending_request)
     
     return False, keyboard
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+🚦 Per-User In-Flight Requests
+Merges repeated taps on the same deep link and runs
+different requests of one user one at a time
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import asynccontextmanager
+from typing import Dict
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+
+class _UserState:
+    """Lock + active request keys of one user"""
+    
+    __slots__ = ("lock", "active", "holders")
+    
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        # request key -> started at (monotonic)
+        self.active: Dict[str, float] = {}
+        # Tasks holding or waiting for the lock
+        self.holders = 0
+
+
+class UserRequestRegistry:
+    """
+    In-flight request registry
+    
+    - begin(): claims a request key (copy_id, bundle:ID); a second tap
+      while the first is still running or its delivery is queued is merged
+    - serialize(): per-user lock around the request pipeline
+    - end(): releases the key - called when the request is rejected or
+      its outbox job is settled; keys older than INFLIGHT_REQUEST_TTL expire
+    
+    User state is dropped once it holds no keys and no lock waiters.
+    """
+    
+    def __init__(self):
+        self._users: Dict[int, _UserState] = {}
+        self._begins = 0
+        self.merged = 0
+    
+    def begin(self, user_id: int, key: str) -> bool:
+        """
+        Claim a request
+        
+        Returns:
+            False if the same request is already in flight
+        """
+        self._begins += 1
+        if self._begins % 1000 == 0:
+            self._prune()
+        
+        state = self._users.get(user_id)
+        if state is None:
+            state = self._users[user_id] = _UserState()
+        
+        started = state.active.get(key)
+        if started is not None and time.monotonic() - started < config.INFLIGHT_REQUEST_TTL:
+            self.merged += 1
+            return False
+        
+        state.active[key] = time.monotonic()
+        return True
+    
+    def end(self, user_id: int, key: str):
+        """Release a request (no-op if unknown)"""
+        state = self._users.get(user_id)
+        if state is None:
+            return
+        
+        state.active.pop(key, None)
+        self._cleanup(user_id, state)
+    
+    @asynccontextmanager
+    async def serialize(self, user_id: int):
+        """Run block exclusively for this user"""
+        state = self._users.get(user_id)
+        if state is None:
+            state = self._users[user_id] = _UserState()
+        
+        state.holders += 1
+        try:
+            async with state.lock:
+                yield
+        finally:
+            state.holders -= 1
+            self._cleanup(user_id, state)
+    
+    def _cleanup(self, user_id: int, state: _UserState):
+        if not state.active and state.holders == 0 and self._users.get(user_id) is state:
+            del self._users[user_id]
+    
+    def _prune(self):
+        """Drop expired keys (jobs settled by another instance, lost releases)"""
+        cutoff = time.monotonic() - config.INFLIGHT_REQUEST_TTL
+        for user_id, state in list(self._users.items()):
+            for key in [k for k, started in state.active.items() if started < cutoff]:
+                del state.active[key]
+            self._cleanup(user_id, state)
+    
+    def get_state(self) -> Dict:
+        """Registry size for /limits"""
+        return {
+            "users": len(self._users),
+            "active": sum(len(s.active) for s in self._users.values()),
+            "merged": self.merged
+        }
+
+
+# Global registry
+user_requests = UserRequestRegistry()
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+"""
+📥 Content Ingest Helpers
+Turns content channel posts into catalog entries
+Shared by live channel monitoring and history backfill
+"""
+
+import uuid
+from typing import Optional
+from pyrogram.types import Message
+
+
+def generate_copy_id() -> str:
+    """Short unique content ID"""
+    return str(uuid.uuid4())[:8]
+
+
+def extract_content(message: Message) -> Optional[dict]:
+    """
+    Classify a content channel post
+    
+    Returns:
+        {"content_type", "message_id", "link"} or None if not content
+    """
+    if message.video or message.document:
+        return {"content_type": "video", "message_id": message.id, "link": None}
+    
+    if message.text:
+        # Check if message contains a link (entity type is an enum in Pyrogram 2)
+        entities = message.entities or []
+        links = [
+            message.text[entity.offset:entity.offset + entity.length]
+            for entity in entities
+            if getattr(entity.type, "value", entity.type) == "url"
+        ]
+        
+        if links:
+            # Take first link
+            return {"content_type": "link", "message_id": None, "link": links[0]}
+    
+    return None
@@ -0,0 +1,221 @@
+# -*- coding: utf-8 -*-
+"""
+📬 Delivery Outbox
+MongoDB-backed delivery jobs with crash recovery
+Handlers enqueue, a worker loop claims jobs in batches and sends them
+"""
+
+import asyncio
+import logging
+import random
+import socket
+from datetime import datetime, timedelta
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from pyrogram import Client
+from pyrogram.errors import RandomIdDuplicate
+from bot.config import config
+from bot.database import (
+    enqueue_delivery_job,
+    claim_delivery_jobs,
+    release_worker_jobs,
+    renew_delivery_job_lease,
+    update_delivery_job
+)
+from bot.utils.inflight import user_requests
+
+logger = logging.getLogger(__name__)
+
+# send(client, job) -> sent message id ({copy_id: id} for bundles),
+# or None if permanently undeliverable
+SendHandler = Callable[[Client, Dict], Awaitable[Optional[Any]]]
+# finish(client, job, message_id) -> tracking + confirmation
+FinishHandler = Callable[[Client, Dict, Any], Awaitable[None]]
+# failed(client, job) -> tell user after final failure
+FailedHandler = Callable[[Client, Dict], Awaitable[None]]
+
+
+def new_random_ids(content: Dict):
+    """
+    Telegram random_id for every message a job sends
+    
+    Returns:
+        [ids] (one per album part), or {copy_id: [ids]} for bundles
+    """
+    def ids_for(item: Dict) -> List[int]:
+        return [random.getrandbits(63) for _ in item.get("message_ids") or [1]]
+    
+    if content.get("content_type") == "bundle":
+        return {item["copy_id"]: ids_for(item) for item in content["items"]}
+    return ids_for(content)
+
+
+class DeliveryOutbox:
+    """
+    Durable delivery queue
+    
+    - Idempotency key per job: enqueueing the same request twice, or
+      retrying a job that already reached "sent", never sends again
+    - Jobs are claimed one by one with a lease and a claim token; a worker
+      that lost its claim cannot move the job any more and skips the send
+    - The lease is renewed while a send waits in the scheduler queue, and
+      every attempt reuses the job's Telegram random_ids - a repeat of a
+      send that already went out is rejected by Telegram (RANDOM_ID_DUPLICATE)
+    - Batches are claimed at the pace the send scheduler drains them
+    """
+    
+    def __init__(self):
+        self.worker_id = config.INSTANCE_ID or socket.gethostname()
+        self._client: Optional[Client] = None
+        self._send: Optional[SendHandler] = None
+        self._finish: Optional[FinishHandler] = None
+        self._failed: Optional[FailedHandler] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+    
+    async def start(self, client: Client, send: SendHandler, finish: FinishHandler, failed: FailedHandler):
+        """Resume unfinished jobs and start worker loop"""
+        self._client = client
+        self._send = send
+        self._finish = finish
+        self._failed = failed
+        self._wakeup = asyncio.Event()
+        
+        resumed = await release_worker_jobs(self.worker_id)
+        if resumed:
+            logger.info(f"📬 Resuming {resumed} unfinished delivery job(s)")
+        
+        self._task = asyncio.create_task(self._run())
+    
+    async def enqueue(self, user_id: int, copy_id: str, content: Dict,
+                      reply_to_message_id: int = None, idempotency_key: str = None) -> Dict:
+        """
+        Add delivery job
+        
+        Args:
+            idempotency_key: Defaults to user:copy_id:request message id
+        
+        Returns:
+            Stored job
+        """
+        key = idempotency_key or f"{user_id}:{copy_id}:{reply_to_message_id}"
+        job = await enqueue_delivery_job(
+            key, user_id, copy_id, content, reply_to_message_id, new_random_ids(content)
+        )
+        
+        if self._wakeup:
+            self._wakeup.set()
+        
+        return job
+    
+    async def _run(self):
+        """Worker loop: claim → send → record"""
+        while True:
+            try:
+                jobs = await claim_delivery_jobs(
+                    self.worker_id,
+                    config.OUTBOX_BATCH_SIZE,
+                    config.OUTBOX_LEASE_SECONDS
+                )
+                
+                if not jobs:
+                    self._wakeup.clear()
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout=config.OUTBOX_POLL_INTERVAL)
+                    except asyncio.TimeoutError:
+                        pass
+                    continue
+                
+                await asyncio.gather(*(self._process(job) for job in jobs))
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Outbox worker error: {e}", exc_info=True)
+                await asyncio.sleep(config.OUTBOX_POLL_INTERVAL)
+    
+    async def _process(self, job: Dict):
+        """Run one job from its current state"""
+        job_id = job["_id"]
+        token = job["claim_token"]
+        message_id = job.get("sent_message_id")
+        sent = job["status"] == "sent"
+        settled = False
+        
+        try:
+            if not sent:
+                if not await update_delivery_job(job_id, token, "sending"):
+                    logger.warning(f"⚠️ Delivery job {job['idempotency_key']} taken over by another worker - skipped")
+                    return
+                
+                keeper = asyncio.create_task(self._keep_lease(job_id, token))
+                try:
+                    message_id = await self._send(self._client, job)
+                finally:
+                    keeper.cancel()
+                
+                if message_id is None:
+                    settled = True
+                    await update_delivery_job(job_id, token, "failed", error="undeliverable")
+                    return
+                
+                # Record send result before anything else
+                if not await update_delivery_job(job_id, token, "sent", sent_message_id=message_id):
+                    logger.warning(f"⚠️ Delivery job {job['idempotency_key']} lease lost after send")
+                    return
+                sent = True
+            
+            await self._finish(self._client, job, message_id)
+            settled = True
+            await update_delivery_job(job_id, token, "done")
+        
+        except RandomIdDuplicate:
+            # An earlier attempt already went out (job was interrupted before
+            # recording it) - Telegram dropped the repeat; message IDs are unknown
+            settled = True
+            logger.info(f"♻️ Delivery job {job['idempotency_key']} was already sent - repeat rejected by Telegram")
+            await update_delivery_job(job_id, token, "done", error="already sent")
+        
+        except Exception as e:
+            attempts = job.get("attempts", 0) + (0 if sent else 1)
+            retry_at = datetime.utcnow() + timedelta(seconds=min(2 ** attempts, 300))
+            logger.error(f"❌ Delivery job {job['idempotency_key']} failed (attempt {attempts}): {e}")
+            
+            if sent:
+                # Message is out - only tracking/confirmation is redone
+                await update_delivery_job(job_id, token, "sent", error=str(e)[:200], lease_until=retry_at)
+            elif attempts < config.OUTBOX_MAX_ATTEMPTS:
+                await update_delivery_job(
+                    job_id, token, "pending",
+                    error=str(e)[:200], next_attempt_at=retry_at, lease_until=None
+                )
+            elif await update_delivery_job(job_id, token, "failed", error=str(e)[:200]):
+                settled = True
+                await self._failed(self._client, job)
+        
+        finally:
+            # Request is over - user may ask for it again
+            if settled:
+                user_requests.end(job["user_id"], job["copy_id"])
+    
+    async def _keep_lease(self, job_id, token: str):
+        """Renew the job's lease while its send waits in the scheduler"""
+        while True:
+            await asyncio.sleep(config.OUTBOX_LEASE_SECONDS / 3)
+            try:
+                if not await renew_delivery_job_lease(job_id, token, config.OUTBOX_LEASE_SECONDS):
+                    return
+            except Exception as e:
+                logger.warning(f"⚠️ Lease renewal failed: {e}")
+    
+    async def stop(self):
+        """Stop worker loop; claimed jobs resume on next start"""
+        if self._task and not self._task.done():
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+
+# Global delivery outbox
+delivery_outbox = DeliveryOutbox()
@@ -0,0 +1,256 @@
+# -*- coding: utf-8 -*-
+"""
+🚦 Adaptive Rate Limiter
+Token bucket per Telegram API method for read-type calls
+Backs off on FloodWait and recovers gradually
+"""
+
+import asyncio
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+from pyrogram.errors import FloodWait
+from bot.config import config
+
+logger = logging.getLogger(__name__)
+
+# Per-call Pyrogram sleep_threshold (None = client default)
+_sleep_threshold: ContextVar[Optional[int]] = ContextVar("sleep_threshold", default=None)
+
+
+@contextmanager
+def raise_flood_wait():
+    """
+    API calls made inside this block raise every FloodWait instead of
+    sleeping in the session (needs install_flood_passthrough)
+    """
+    token = _sleep_threshold.set(0)
+    try:
+        yield
+    finally:
+        _sleep_threshold.reset(token)
+
+
+def install_flood_passthrough(client):
+    """
+    Wrap client.invoke so raise_flood_wait() can override the client's
+    sleep_threshold for single calls; everything else keeps sleeping
+    through short FloodWaits (FLOOD_SLEEP_THRESHOLD)
+    """
+    invoke = client.invoke
+    
+    async def _invoke(query, *args, **kwargs):
+        override = _sleep_threshold.get()
+        if override is not None and len(args) < 3 and kwargs.get("sleep_threshold") is None:
+            kwargs["sleep_threshold"] = override
+        return await invoke(query, *args, **kwargs)
+    
+    client.invoke = _invoke
+
+
+class RateLimited(Exception):
+    """Raised instead of waiting when a method is blocked for too long"""
+    
+    def __init__(self, method: str, retry_after: float):
+        self.method = method
+        self.retry_after = retry_after
+        super().__init__(f"{method} rate limited, retry after {retry_after:.1f}s")
+
+
+class TokenBucket:
+    """Classic token bucket with adjustable rate"""
+    
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+    
+    def _refill(self, now: float):
+        elapsed = now - self.updated_at
+        self.tokens = min(self.capacity, self.tokens + elapsed * self.rate)
+        self.updated_at = now
+    
+    def wait_time(self) -> float:
+        """Seconds until one token is available (0 if available now)"""
+        self._refill(time.monotonic())
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+    
+    def consume(self):
+        self._refill(time.monotonic())
+        self.tokens -= 1
+
+
+class AdaptiveRateLimiter:
+    """
+    Shared limiter for read-type API calls
+    
+    - One token bucket per method
+    - FloodWait halves the method's rate and blocks it for the wait period
+    - Each success afterwards adds back a small step of the base rate
+    - Calls that would wait longer than RATE_LIMIT_MAX_WAIT raise RateLimited
+      so handlers can fail open instead of parking a worker
+    """
+    
+    def __init__(self, rates: Dict[str, float]):
+        self.base_rates = dict(rates)
+        self.buckets: Dict[str, TokenBucket] = {
+            method: TokenBucket(rate, max(1.0, rate)) for method, rate in rates.items()
+        }
+        self.blocked_until: Dict[str, float] = {}
+        self.flood_waits: Dict[str, int] = {method: 0 for method in rates}
+        self.calls: Dict[str, int] = {method: 0 for method in rates}
+    
+    def _bucket(self, method: str) -> TokenBucket:
+        if method not in self.buckets:
+            rate = config.API_RATE_DEFAULT
+            self.base_rates[method] = rate
+            self.buckets[method] = TokenBucket(rate, max(1.0, rate))
+            self.flood_waits[method] = 0
+            self.calls[method] = 0
+        return self.buckets[method]
+    
+    async def acquire(self, method: str):
+        """Wait for a token, or raise RateLimited if the wait is too long"""
+        bucket = self._bucket(method)
+        
+        while True:
+            blocked = self.blocked_until.get(method, 0) - time.monotonic()
+            wait = max(blocked, bucket.wait_time())
+            
+            if wait <= 0:
+                bucket.consume()
+                return
+            
+            if wait > config.RATE_LIMIT_MAX_WAIT:
+                raise RateLimited(method, wait)
+            
+            await asyncio.sleep(wait)
+    
+    def on_success(self, method: str):
+        """Recover rate gradually after a backoff"""
+        bucket = self._bucket(method)
+        base = self.base_rates[method]
+        self.calls[method] += 1
+        
+        if bucket.rate < base:
+            bucket.rate = min(base, bucket.rate + base * config.RATE_LIMIT_RECOVERY_STEP)
+    
+    def on_flood_wait(self, method: str, seconds: float):
+        """Back off: halve rate and block method for the wait period"""
+        bucket = self._bucket(method)
+        bucket.rate = max(config.RATE_LIMIT_MIN_RATE, bucket.rate / 2)
+        bucket.tokens = min(bucket.tokens, 0)
+        self.blocked_until[method] = time.monotonic() + seconds
+        self.flood_waits[method] += 1
+        
+        logger.warning(f"🚦 FloodWait on {method}: {seconds}s, rate lowered to {bucket.rate:.2f}/s")
+    
+    async def call(self, method: str, func: Callable[..., Awaitable[Any]], *args, **kwargs) -> Any:
+        """
+        Run an API call through the limiter
+        
+        Example:
+            await read_limiter.call("get_chat", client.get_chat, channel_id)
+        """
+        await self.acquire(method)
+        
+        try:
+            # Short FloodWaits must reach the limiter, not park this worker
+            with raise_flood_wait():
+                result = await func(*args, **kwargs)
+        except FloodWait as e:
+            self.on_flood_wait(method, e.value)
+            raise
+        
+        self.on_success(method)
+        return result
+    
+    def get_state(self) -> Dict[str, Dict]:
+        """Current limiter state per method (for admin monitoring)"""
+        now = time.monotonic()
+        state = {}
+        
+        for method, bucket in self.buckets.items():
+            bucket._refill(now)
+            state[method] = {
+                "rate": round(bucket.rate, 2),
+                "base_rate": self.base_rates[method],
+                "tokens": round(bucket.tokens, 2),
+                "blocked_for": round(max(0.0, self.blocked_until.get(method, 0) - now), 1),
+                "flood_waits": self.flood_waits[method],
+                "calls": self.calls[method]
+            }
+        
+        return state
+
+
+class UserThrottle:
+    """
+    Per-user token bucket for incoming requests (deep links, callbacks)
+    
+    Storage per user: [tokens, updated_at, warned] - users whose bucket
+    has refilled completely are dropped (same as never seen)
+    """
+    
+    def __init__(self, rate: float, burst: float):
+        self.rate = rate
+        self.burst = burst
+        self._buckets: Dict[int, list] = {}
+        self._calls = 0
+        self.throttled = 0
+    
+    def allow(self, user_id: int) -> Tuple[bool, bool]:
+        """
+        Take one token for this user
+        
+        Returns:
+            (allowed, first_throttled) - first_throttled is True only for the
+            first rejected request in a row (reply once, then stay silent)
+        """
+        now = time.monotonic()
+        
+        self._calls += 1
+        if self._calls % 1000 == 0:
+            self._prune(now)
+        
+        bucket = self._buckets.get(user_id)
+        if bucket is None:
+            bucket = self._buckets[user_id] = [self.burst, now, False]
+        else:
+            bucket[0] = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            bucket[1] = now
+        
+        if bucket[0] >= 1:
+            bucket[0] -= 1
+            bucket[2] = False
+            return True, False
+        
+        self.throttled += 1
+        first = not bucket[2]
+        bucket[2] = True
+        return False, first
+    
+    def _prune(self, now: float):
+        """Drop idle users (bucket full again)"""
+        full_after = self.burst / self.rate if self.rate > 0 else float("inf")
+        for user_id in [u for u, b in self._buckets.items() if now - b[1] >= full_after]:
+            del self._buckets[user_id]
+    
+    def get_state(self) -> Dict:
+        return {"users": len(self._buckets), "throttled": self.throttled}
+
+
+# Global limiter for read-type calls
+read_limiter = AdaptiveRateLimiter({
+    "get_chat_member": config.API_RATE_GET_CHAT_MEMBER,
+    "get_chat": config.API_RATE_GET_CHAT,
+    "create_chat_invite_link": config.API_RATE_INVITE_LINK
+})
+
+# Global per-user request throttle
+user_throttle = UserThrottle(config.USER_THROTTLE_RATE, config.USER_THROTTLE_BURST)
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+"""
+🧹 Delivery Retention
+Keeps user_deliveries small: TTL index on delivered_at (see database)
+plus a throttled "keep last N per user" compactor
+"""
+
+import asyncio
+import logging
+import time
+from typing import Dict, Optional
+from bot.config import config
+from bot.database import (
+    find_users_over_delivery_limit,
+    compact_user_deliveries,
+    get_collection_size
+)
+
+logger = logging.getLogger(__name__)
+
+_task: Optional[asyncio.Task] = None
+_stop_requested = False
+_progress: Dict = {}
+
+
+def is_compaction_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def get_compaction_progress() -> Dict:
+    """Current/last run progress (in memory)"""
+    return dict(_progress)
+
+
+def stop_compaction():
+    """Ask running compaction to stop after the current user"""
+    global _stop_requested
+    _stop_requested = True
+
+
+def start_compaction() -> bool:
+    """
+    Start compaction in background
+    
+    Returns:
+        False if already running or DELIVERY_KEEP_LAST is 0
+    """
+    global _task, _stop_requested
+    
+    if is_compaction_running() or config.DELIVERY_KEEP_LAST <= 0:
+        return False
+    
+    _stop_requested = False
+    _task = asyncio.create_task(run_compaction(config.DELIVERY_KEEP_LAST))
+    return True
+
+
+async def run_compaction(keep_last: int) -> Dict:
+    """
+    Trim every user's delivery history to the newest keep_last records
+    
+    Over-limit users come from a server-side aggregation; each user is
+    trimmed with batched deletes, pausing RETENTION_COMPACT_PAUSE between users
+    
+    Returns:
+        Final progress
+    """
+    started = time.monotonic()
+    _progress.clear()
+    _progress.update({
+        "status": "running",
+        "keep_last": keep_last,
+        "users": 0,
+        "deleted": 0,
+        "reclaimed_bytes": 0
+    })
+    
+    try:
+        before = await get_collection_size("user_deliveries")
+        _progress["size_before"] = before.get("size", 0) + before.get("index_size", 0)
+        avg_size = before.get("avg_obj_size", 0)
+        
+        async for row in find_users_over_delivery_limit(keep_last):
+            if _stop_requested:
+                _progress["status"] = "stopped"
+                break
+            
+            deleted = await compact_user_deliveries(row["_id"], keep_last)
+            _progress["users"] += 1
+            _progress["deleted"] += deleted
+            # Data size estimate; index entries are reclaimed on top of this
+            _progress["reclaimed_bytes"] = _progress["deleted"] * avg_size
+            
+            await asyncio.sleep(config.RETENTION_COMPACT_PAUSE)
+        
+        if _progress["status"] == "running":
+            _progress["status"] = "done"
+        
+        after = await get_collection_size("user_deliveries")
+        _progress["size_after"] = after.get("size", 0) + after.get("index_size", 0)
+    
+    except Exception as e:
+        _progress["status"] = "failed"
+        _progress["error"] = str(e)[:200]
+        logger.error(f"❌ Delivery compaction failed: {e}", exc_info=True)
+    
+    _progress["elapsed"] = round(time.monotonic() - started, 1)
+    logger.info(
+        f"🧹 Delivery compaction {_progress['status']}: {_progress['deleted']} records "
+        f"from {_progress['users']} users (~{_progress['reclaimed_bytes'] // 1024} KB) "
+        f"in {_progress['elapsed']}s"
+    )
+    return get_compaction_progress()
+
+
+async def retention_loop():
+    """Background task: run compactor every RETENTION_COMPACT_INTERVAL seconds"""
+    if config.RETENTION_COMPACT_INTERVAL <= 0 or config.DELIVERY_KEEP_LAST <= 0:
+        return
+    
+    while True:
+        await asyncio.sleep(config.RETENTION_COMPACT_INTERVAL)
+        
+        if start_compaction():
+            await _task
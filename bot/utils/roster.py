@@ -0,0 +1,106 @@
+# -*- coding: utf-8 -*-
+"""
+🧾 Channel Roster
+Local mirror of force join channel membership
+Built from chat member updates, persisted in MongoDB
+"""
+
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Optional, Set, Tuple
+from bot.config import config
+from bot.database import save_channel_member, get_channel_members_cursor
+
+logger = logging.getLogger(__name__)
+
+# (channel_id, user_id) -> signed timestamp, least recently used first
+# +seen_at = member, -seen_at = not member (one int per user)
+# Capped at ROSTER_MAX_SIZE; stale entries are dropped when read
+_rosters: "OrderedDict[Tuple[int, int], int]" = OrderedDict()
+
+# Pending database writes (keep references so they aren't garbage collected)
+_pending_writes: Set[asyncio.Task] = set()
+
+
+def get_roster_membership(user_id: int, channel_id: int) -> Optional[bool]:
+    """
+    Answer membership from local roster
+    
+    Returns:
+        True/False if a fresh entry exists, None if unknown or stale
+    """
+    if not config.ROSTER_ENABLED:
+        return None
+    
+    key = (channel_id, user_id)
+    stamp = _rosters.get(key)
+    if stamp is None:
+        return None
+    
+    if time.time() - abs(stamp) > config.ROSTER_STALE_AFTER:
+        del _rosters[key]
+        return None
+    
+    _rosters.move_to_end(key)
+    return stamp > 0
+
+
+def _remember(user_id: int, channel_id: int, is_member: bool, seen_at: float):
+    """Store entry in memory (evicts least recently used above ROSTER_MAX_SIZE)"""
+    stamp = max(int(seen_at), 1)
+    key = (channel_id, user_id)
+    _rosters[key] = stamp if is_member else -stamp
+    _rosters.move_to_end(key)
+    
+    while len(_rosters) > config.ROSTER_MAX_SIZE:
+        _rosters.popitem(last=False)
+
+
+async def record_membership(user_id: int, channel_id: int, is_member: bool):
+    """
+    Record membership from a join/leave event or an API check
+    Updates memory immediately, then persists
+    """
+    if not config.ROSTER_ENABLED:
+        return
+    
+    _remember(user_id, channel_id, is_member, time.time())
+    await save_channel_member(channel_id, user_id, is_member)
+
+
+def record_membership_later(user_id: int, channel_id: int, is_member: bool):
+    """Record membership without making the caller wait for the database"""
+    if not config.ROSTER_ENABLED:
+        return
+    
+    _remember(user_id, channel_id, is_member, time.time())
+    task = asyncio.create_task(save_channel_member(channel_id, user_id, is_member))
+    _pending_writes.add(task)
+    task.add_done_callback(_pending_writes.discard)
+
+
+async def load_rosters():
+    """
+    Load non-stale roster entries from database on startup
+    Streams the collection in batches
+    """
+    if not config.ROSTER_ENABLED:
+        return
+    
+    since = datetime.utcnow() - timedelta(seconds=config.ROSTER_STALE_AFTER)
+    loaded = 0
+    
+    try:
+        async for doc in get_channel_members_cursor(since):
+            # Stored as naive UTC
+            seen_at = (doc["updated_at"] - datetime(1970, 1, 1)).total_seconds()
+            _remember(doc["user_id"], doc["channel_id"], doc["is_member"], seen_at)
+            loaded += 1
+        
+        logger.info(f"🧾 Channel roster loaded: {loaded} entries ({len(_rosters)} kept in memory)")
+    except Exception as e:
+        logger.error(f"❌ Failed to load channel roster: {e}")
+
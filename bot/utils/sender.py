@@ -0,0 +1,227 @@
+# -*- coding: utf-8 -*-
+"""
+📤 Outbound Send Scheduler
+Single queue for all outgoing messages
+Respects Telegram's global and per-chat limits, prioritizes deliveries
+"""
+
+import asyncio
+import heapq
+import itertools
+import logging
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from pyrogram.errors import FloodWait
+from bot.config import config
+from bot.utils.rate_limiter import raise_flood_wait
+
+logger = logging.getLogger(__name__)
+
+# Lower value = sent first
+PRIORITY_DELIVERY = 0
+PRIORITY_CONFIRMATION = 1
+PRIORITY_NOTIFICATION = 2
+PRIORITY_CLEANUP = 3
+
+
+class SendScheduler:
+    """
+    Async priority send queue
+    
+    - Global limit: SEND_GLOBAL_RATE messages per second
+    - Per-chat limit: one message per SEND_PER_CHAT_INTERVAL seconds
+    - FloodWait pauses the whole queue and the send is re-queued
+      (up to SEND_MAX_RETRIES times) instead of sleeping in a handler;
+      sends run with Pyrogram's auto-sleep off, so every wait is seen here
+    
+    Jobs whose chat is still inside its interval are parked in a delay
+    heap keyed by the time the chat becomes ready, so every dequeue is
+    O(log n) heap work.
+    """
+    
+    def __init__(self):
+        # (priority, seq, chat_id, factory, future, attempts)
+        self._queue: List[tuple] = []
+        # (ready_at, seq, job) - jobs waiting for their chat's interval
+        self._delayed: List[tuple] = []
+        self._tasks: Set[asyncio.Task] = set()
+        self._seq = itertools.count()
+        self._chat_next: Dict[int, float] = {}
+        self._global_next = 0.0
+        self._paused_until = 0.0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+        self.sent = 0
+        self.failed = 0
+        self.flood_waits = 0
+    
+    def _ensure_started(self):
+        if self._worker is None or self._worker.done():
+            self._wakeup = asyncio.Event()
+            self._worker = asyncio.create_task(self._run())
+    
+    def submit(self, chat_id: int, factory: Callable[[], Awaitable[Any]],
+               priority: int = PRIORITY_DELIVERY) -> asyncio.Future:
+        """
+        Queue a send
+        
+        Args:
+            chat_id: Target chat (for per-chat limit)
+            factory: Zero-arg callable returning the API coroutine
+            priority: PRIORITY_* constant
+        
+        Returns:
+            Future resolved with the API result
+        """
+        self._ensure_started()
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), chat_id, factory, future, 0))
+        self._wakeup.set()
+        return future
+    
+    def send_later(self, chat_id: int, factory: Callable[[], Awaitable[Any]],
+                   priority: int = PRIORITY_CONFIRMATION) -> asyncio.Future:
+        """Fire-and-forget send; failures are only logged"""
+        future = self.submit(chat_id, factory, priority)
+        future.add_done_callback(_log_send_failure)
+        return future
+    
+    def _pop_ready(self, now: float) -> Optional[tuple]:
+        """Pop highest priority job whose chat is ready to receive"""
+        while self._delayed and self._delayed[0][0] <= now:
+            heapq.heappush(self._queue, heapq.heappop(self._delayed)[2])
+        
+        while self._queue:
+            item = heapq.heappop(self._queue)
+            ready_at = self._chat_next.get(item[2], 0)
+            if ready_at <= now:
+                return item
+            heapq.heappush(self._delayed, (ready_at, item[1], item))
+        
+        return None
+    
+    async def _sleep(self, seconds: float):
+        """Sleep, but wake early when a new job arrives"""
+        self._wakeup.clear()
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+    
+    async def _run(self):
+        """Dispatcher loop"""
+        while True:
+            try:
+                if not self._queue and not self._delayed:
+                    self._wakeup.clear()
+                    await self._wakeup.wait()
+                    continue
+                
+                now = time.monotonic()
+                wait = max(self._paused_until, self._global_next) - now
+                if wait > 0:
+                    await asyncio.sleep(wait)
+                    continue
+                
+                item = self._pop_ready(now)
+                if item is None:
+                    await self._sleep(max(0.01, self._delayed[0][0] - now))
+                    continue
+                
+                chat_id = item[2]
+                self._global_next = now + 1 / config.SEND_GLOBAL_RATE
+                self._chat_next[chat_id] = now + config.SEND_PER_CHAT_INTERVAL
+                
+                # Forget chats whose limit window has passed
+                if len(self._chat_next) > 10000:
+                    self._chat_next = {c: t for c, t in self._chat_next.items() if t > now}
+                
+                task = asyncio.create_task(self._execute(item))
+                self._tasks.add(task)
+                task.add_done_callback(self._tasks.discard)
+            
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"❌ Send scheduler error: {e}", exc_info=True)
+    
+    async def _execute(self, item: tuple):
+        """Run one send and resolve its future"""
+        priority, _, chat_id, factory, future, attempts = item
+        
+        if future.cancelled():
+            return
+        
+        try:
+            # Every FloodWait must pause the queue, not sleep inside this send
+            with raise_flood_wait():
+                result = await factory()
+            self.sent += 1
+            if not future.done():
+                future.set_result(result)
+        
+        except FloodWait as e:
+            self.flood_waits += 1
+            self._paused_until = max(self._paused_until, time.monotonic() + e.value)
+            logger.warning(f"⏳ Flood wait: {e.value} seconds - send queue paused")
+            
+            if attempts < config.SEND_MAX_RETRIES:
+                heapq.heappush(self._queue, (priority, next(self._seq), chat_id, factory, future, attempts + 1))
+                self._wakeup.set()
+            else:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(e)
+        
+        except Exception as e:
+            self.failed += 1
+            if not future.done():
+                future.set_exception(e)
+    
+    def get_state(self) -> Dict:
+        """Queue state (for admin monitoring)"""
+        return {
+            "queued": len(self._queue) + len(self._delayed),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 1),
+            "sent": self.sent,
+            "failed": self.failed,
+            "flood_waits": self.flood_waits
+        }
+    
+    async def stop(self, timeout: float = 10):
+        """
+        Stop dispatcher
+        Sends already started get up to timeout seconds to finish;
+        queued sends are cancelled (and counted in the log)
+        """
+        if self._worker and not self._worker.done():
+            self._worker.cancel()
+            try:
+                await self._worker
+            except asyncio.CancelledError:
+                pass
+        
+        if self._tasks:
+            done, pending = await asyncio.wait(set(self._tasks), timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+        
+        dropped = [job for job in self._queue] + [entry[2] for entry in self._delayed]
+        self._queue.clear()
+        self._delayed.clear()
+        for job in dropped:
+            job[4].cancel()
+        
+        if dropped:
+            logger.warning(f"⚠️ Send scheduler stopped: {len(dropped)} queued send(s) cancelled")
+
+
+def _log_send_failure(future: asyncio.Future):
+    if not future.cancelled() and future.exception():
+        logger.error(f"❌ Queued send failed: {future.exception()}")
+
+
+# Global send scheduler
+send_scheduler = SendScheduler()
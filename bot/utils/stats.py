@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+"""
+📊 Statistics Reconciler
+The stats document is kept current with $inc on every write;
+this job recounts the collections periodically to correct drift
+"""
+
+import asyncio
+import logging
+from bot.config import config
+from bot.database import get_stats, reconcile_stats
+
+logger = logging.getLogger(__name__)
+
+
+async def stats_reconcile_loop():
+    """
+    Background task: recount every STATS_RECONCILE_INTERVAL seconds
+    Runs at once if the counters were never reconciled (first start)
+    """
+    if config.STATS_RECONCILE_INTERVAL <= 0:
+        return
+    
+    if not (await get_stats()).get("reconciled_at"):
+        try:
+            await reconcile_stats()
+        except Exception as e:
+            logger.error(f"❌ Stats reconcile failed: {e}")
+    
+    while True:
+        await asyncio.sleep(config.STATS_RECONCILE_INTERVAL)
+        
+        try:
+            await reconcile_stats()
+        except Exception as e:
+            logger.error(f"❌ Stats reconcile failed: {e}")
@@ -10,8 +10,17 @@ import asyncio
 import logging
 from pyrogram import Client
 from bot.config import config
-from bot.database import init_database
+from bot.database import init_database, backfill_users
 from bot.handlers import register_handlers
+from bot.utils.channel_registry import load_channel_registry, channel_registry_loop
+from bot.utils.roster import load_rosters
+from bot.utils.retention import retention_loop
+from bot.utils.stats import stats_reconcile_loop
+from bot.utils.sender import send_scheduler
+from bot.utils.rate_limiter import install_flood_passthrough
+from bot.utils.outbox import delivery_outbox
+from bot.utils.duplicate import delivery_write_buffer
+from bot.handlers.content import process_delivery_job, finish_delivery_job, fail_delivery_job
 
 # Configure logging - বাংলায় error দেখাবে
 logging.basicConfig(
@@ -44,8 +53,9 @@ async def main():
             api_hash=config.API_HASH,
             bot_token=config.BOT_TOKEN,
             workers=4,  # Multiple workers for better performance
-            sleep_threshold=60  # Flood wait handling
+            sleep_threshold=config.FLOOD_SLEEP_THRESHOLD  # Flood wait handling (rate limited calls raise instead)
         )
+        install_flood_passthrough(app)
         
         # Register all handlers
         register_handlers(app)
@@ -59,6 +69,18 @@ async def main():
         await app.start()
         logger.info("✅ Bot started successfully! Ready to serve content! 🎬")
         
+        # Background tasks (keep references so they aren't garbage collected)
+        await load_channel_registry()
+        await load_rosters()
+        delivery_write_buffer.start(app)
+        await delivery_outbox.start(app, process_delivery_job, finish_delivery_job, fail_delivery_job)
+        background_tasks = [
+            asyncio.create_task(channel_registry_loop(app)),
+            asyncio.create_task(backfill_users()),
+            asyncio.create_task(retention_loop()),
+            asyncio.create_task(stats_reconcile_loop())
+        ]
+        
         # Keep the bot running
         await asyncio.Event().wait()
         
@@ -69,6 +91,9 @@ async def main():
         raise
     finally:
         try:
+            await delivery_outbox.stop()
+            await delivery_write_buffer.stop()
+            await send_scheduler.stop()
             await app.stop()
             logger.info("👋 Bot stopped gracefully")
         except: